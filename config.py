@@ -16,6 +16,18 @@ class Config:
     # カメラのサイズ
     CAMERA_WIDTH = 320
     CAMERA_HEIGHT = 240
+    CAMERA_IMAGE_BANK = 2  # カメラ映像を書き込むイメージバンク（ゲームの画像では使っていないもの）
+    CAMERA_LUT_CACHE_DIR = "cache"  # カメラ映像の色変換表の保存先（Noneで保存しない）
+
+    # テトロミノ生成設定
+    PIECE_RANDOMIZER = "uniform"  # "uniform"（毎回ランダム）または "bag"（7種類1セットずつ）
+    NEXT_PREVIEW_COUNT = 2  # 先読みするネクストの数（画面には先頭2つを表示）
+
+    # リプレイ設定
+    REPLAY_DIR = "replays"  # リプレイの保存先（Noneで記録しない）
+    REPLAY_KEYFRAME_INTERVAL = 600  # シーク用に状態を保存する間隔（フレーム数）
+    REPLAY_AUTO_PLAY = False  # オートプレイ（デモ）のゲームも保存するか
+    REPLAY_KEEP = 100  # 保存しておくリプレイの数（古いものから消す。0なら消さない）
 
     # ランキング設定
     RANKING_MAX = 10  # 保存する最大ランキング数
@@ -33,4 +45,29 @@ class Config:
     AUTO_DROP_DELAY = 10   # ドロップ前の待機時間（推奨: 5-15）
     AUTO_SPAWN_DELAY = 10  # 新ピース出現時の待機時間（推奨: 5-15）
 
+    # オートプレイの配置評価（"python" または "numpy"：NumPyで全候補を一括評価）
+    AUTO_EVALUATOR = "python"
+    AUTO_WEIGHTS_FILE = "assets/ai_weights.json"  # tools/tune_weights.py で調整した重み（なければ既定値）
+    AUTO_SKYLINE_FILE = "assets/skyline_table.bin"  # tools/build_skyline_table.py で作った表面の形の表（なければ探索のみ）
+
+    # オートプレイの先読み（深さ1で現在のピースのみ。深くするほど強いがCPU時間が増える）
+    AUTO_SEARCH_DEPTH = 1  # 何手先まで読むか（ネクストの数+1が上限）
+    AUTO_BEAM_WIDTH = 8    # 各深さで残す候補の数
+
+    # オートプレイの計画を別スレッドで作る（フレームを止めない。深さ2以上の時に有効）
+    AUTO_PLAN_THREAD = False
+    AUTO_PLAN_DEADLINE = 8  # 計画を待つ最大フレーム数（過ぎたら貪欲法で計画）
+    AUTO_PLAN_CACHE_SIZE = 0  # 覚えておく計画の数（0でキャッシュしない。通常のゲームでは同じ状況がほぼ現れない）
+    AUTO_PLAN_BUDGET_US = 0  # 1フレームで探索に使う時間（マイクロ秒）。0なら使わない（指定時はスレッドより優先）
+    AUTO_SPECULATE_BUDGET_US = 0  # 計画の実行中、1フレームで次のピースの先読みに使う時間（マイクロ秒）。0なら先読みしない
+
+    # オートプレイの戦略（"search": 評価関数で選ぶ / "rollout": 上位の候補をランダムな続きで遊ばせて選ぶ）
+    # "rollout" の時は AUTO_PLAN_BUDGET_US と AUTO_SPECULATE_BUDGET_US を使わない
+    AUTO_STRATEGY = "search"
+    AUTO_ROLLOUT_CANDIDATES = 6  # ロールアウトで比べる候補の数（評価関数の上位から）
+    AUTO_ROLLOUT_COUNT = 64      # 候補ごとのロールアウトの最大回数
+    AUTO_ROLLOUT_DEPTH = 8       # 1回のロールアウトで置くテトロミノの数
+    AUTO_ROLLOUT_WORKERS = 4     # ロールアウトを分配するプロセス数（0ならこのプロセスで実行。Piでは小さく）
+    AUTO_ROLLOUT_TIME_MS = 100   # 1回の選択でロールアウトに使う最大時間（ミリ秒）
+
  
\ No newline at end of file
@@ -0,0 +1,51 @@
+# controller/anytime_planner.py
+import time
+
+
+class AnytimePlanner:
+    """
+    1フレームあたりの時間予算の中で少しずつ探索するプランナー。
+    - BeamSearch.iter_plan() を予算（マイクロ秒）を使い切るまで進め、次のフレームで続きから再開する
+    - 深さを1つ読み終えるごとに最善手を更新するので、いつ打ち切っても直前までの最善手を実行できる
+    - 最初の深さを読み終える前に打ち切った場合は最善手がない（depth_done が0。呼び出し側で貪欲法に切り替える）
+    """
+    def __init__(self, beam, budget_us):
+        self.beam = beam  # BeamSearch
+        self.budget_us = budget_us
+        self.steps = None
+        self.best_plan = []
+        self.best_placed = None
+        self.depth_done = 0  # 読み終えた深さ
+        self.finished = True
+
+    def start(self, snapshot):
+        """新しいピースの探索を始める"""
+        self.steps = self.beam.iter_plan(snapshot.board, snapshot.piece, snapshot.hold,
+                                         snapshot.hold_used, snapshot.queue)
+        self.best_plan = []
+        self.best_placed = None
+        self.depth_done = 0
+        self.finished = False
+
+    def step(self):
+        """予算の分だけ探索を進める（探索が終わったらTrue）"""
+        if self.finished:
+            return True
+
+        deadline = time.perf_counter_ns() + self.budget_us * 1000
+        while time.perf_counter_ns() < deadline:
+            try:
+                result = next(self.steps)
+            except StopIteration:
+                self.finished = True
+                self.steps = None
+                return True
+            if result is not None:
+                _, self.best_plan, self.best_placed = result
+                self.depth_done += 1
+        return False
+
+    def stop(self):
+        """探索を打ち切る"""
+        self.steps = None
+        self.finished = True
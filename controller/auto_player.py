@@ -1,22 +1,80 @@
 # controller/auto_player.py
-from copy import deepcopy
-import math
-import pyxel
+import json
+import os
+
+from controller.move_search import MoveSearch
+from controller.beam_search import BeamSearch
+from controller.plan_worker import PlanWorker
+from controller.plan_cache import PlanCache
+from controller.anytime_planner import AnytimePlanner
+from controller.skyline_table import SkylineTable
+
+
+class PlanSnapshot:
+    """計画に必要な状態のコピー（別スレッドで計画している間にゲームが進んでも変わらない）"""
+    __slots__ = ("board", "piece", "hold", "hold_used", "queue")
+
+    def __init__(self, board, piece, hold, hold_used, queue):
+        self.board = board
+        self.piece = piece
+        self.hold = hold
+        self.hold_used = hold_used
+        self.queue = queue
+
+    @staticmethod
+    def capture(game):
+        """ゲームの今の状態をコピーする"""
+        hold = None if game.hold_tetromino is None else game.hold_tetromino.copy()
+        return PlanSnapshot(game.board.copy(with_grid=False), game.current_tetromino.copy(),
+                            hold, game.hold_used, [t.copy() for t in game.next_tetrominos])
+
+    def predict_next(self, placed):
+        """placed を固定した後、次のピースが出現した時の状態を予測する（ネクストがなければNone）
+
+        新しく補充されるネクストはまだ分からないので、queue はその分だけ短い。
+        """
+        if not self.queue:
+            return None
+        board = self.board.copy(with_grid=False)
+        board.lock_tetromino(placed)
+        board.clear_lines()
+        piece = self.queue[0].copy()
+        piece.x = board.width // 2 - 2
+        piece.y = 0
+        return PlanSnapshot(board, piece, self.hold, False, self.queue[1:])
 
-from model.board import Board
 
 class AutoPlayer:
     """
     デモ用の極シンプルAI。
-    - 毎回、現在ピースに対して「回転0..3 × x位置」を総当り
+    - 毎回、現在ピースで到達できる配置をすべて探索（SRSの壁蹴り・ソフトドロップでの差し込みも含む）
     - Hold機能も考慮して最適な配置を選択
+    - AUTO_SEARCH_DEPTH が2以上なら、ネクストとHoldを使ったビームサーチで数手先まで読む
     - ベストへ向かう操作列（plan）を1フレーム1手ずつ実行
+    - AUTO_PLAN_THREAD なら新ピースの計画を別スレッドで作り、期限までに終わらなければ貪欲法で計画する
+    - 同じ状況（盤面・ピース・Hold・ネクスト）の計画はキャッシュから再利用する
+    - AUTO_PLAN_BUDGET_US を指定すると、1フレームあたりその時間だけ探索を進める（反復深化）
+    - 計画を実行している間の待ちフレームで、着地後に出てくる次のピースの計画を先に作っておく
+    - 穴のない盤面では、表面の形の表（スカイライン表）から候補を引いて探索を省く（深さ1の時）
+    - AUTO_STRATEGY が "rollout" なら、評価関数の上位の候補をモンテカルロ・ロールアウトで比べて選ぶ
     """
-    def __init__(self, game):
+    # 評価関数の重み（盤面特徴量ごとの係数）
+    WEIGHTS = {
+        "lines": 1000,
+        "holes": -8,
+        "agg_height": -1.5,
+        "bumpiness": -2.0,
+        "max_height": -0.5,
+    }
+
+    def __init__(self, game, background=None, weights=None):
         self.game = game
         self.plan = []
         self._last_piece_obj = None  # 参照が変わった＝新ピース出現の検出用
         self.action_delay = 0  # 操作間のディレイ
+        self._expected_pos = None  # 直前の操作後のピースの位置（重力でずれたら計画し直す）
+        self._target = None  # 計画の着地位置 (x, y, 回転)
+        self.search = MoveSearch()
         
         # Configから設定値を読み込む
         from config import Config
@@ -24,23 +82,125 @@ class AutoPlayer:
         self.drop_delay = Config.AUTO_DROP_DELAY  # ドロップ前の待機フレーム数
         self.spawn_delay = Config.AUTO_SPAWN_DELAY  # 新ピース出現時の待機フレーム数
 
+        # 配置の評価（weights省略時は調整済みの重みファイル、なければ既定値）
+        self.weights = dict(AutoPlayer.WEIGHTS)
+        if weights is None and Config.AUTO_WEIGHTS_FILE and os.path.exists(Config.AUTO_WEIGHTS_FILE):
+            weights = AutoPlayer.load_weights(Config.AUTO_WEIGHTS_FILE)
+        if weights is not None:
+            self.weights.update(weights)
+        self.evaluator = None
+        if Config.AUTO_EVALUATOR == "numpy":
+            from controller.placement_evaluator import PlacementEvaluator
+            self.evaluator = PlacementEvaluator(self.weights)
+
+        # 表面の形の表（別の重みで作った表は順位が違うので使わない）
+        self.skyline = None
+        if Config.AUTO_SKYLINE_FILE and os.path.exists(Config.AUTO_SKYLINE_FILE):
+            table = SkylineTable.load(Config.AUTO_SKYLINE_FILE)
+            if table.weights == self.weights:
+                self.skyline = table
+
+        # 先読み（深さ1なら現在のピースだけを見る貪欲法）
+        self.beam = None
+        if Config.AUTO_SEARCH_DEPTH > 1:
+            self.beam = BeamSearch(self.search, self._score_placements,
+                                   Config.AUTO_SEARCH_DEPTH, Config.AUTO_BEAM_WIDTH)
+
+        # モンテカルロ・ロールアウト（プロセスプールは最初のロールアウトで作る）
+        self.rollout = None
+        self.rollout_candidates = Config.AUTO_ROLLOUT_CANDIDATES
+        if Config.AUTO_STRATEGY == "rollout":
+            from controller.rollout_planner import RolloutPlanner
+            self.rollout = RolloutPlanner(self.weights, Config.AUTO_ROLLOUT_COUNT, Config.AUTO_ROLLOUT_DEPTH,
+                                          Config.AUTO_ROLLOUT_WORKERS, Config.AUTO_ROLLOUT_TIME_MS,
+                                          Config.PIECE_RANDOMIZER)
+
+        # 計画のキャッシュ（0なら使わない。命中数はゲームが終わるたびにログに出す）
+        self.plan_cache = PlanCache(Config.AUTO_PLAN_CACHE_SIZE) if Config.AUTO_PLAN_CACHE_SIZE > 0 else None
+        self._stats_reported = True
+
+        # バックグラウンドでの計画（background省略時はConfigに従う）
+        # ロールアウトは1回の計画に AUTO_ROLLOUT_TIME_MS かかるので、描画を止めないよう常に別スレッドで計画する
+        if background is None:
+            background = Config.AUTO_PLAN_THREAD or self.rollout is not None
+        self.worker = PlanWorker(self._make_plan) if background else None
+        self.plan_deadline = Config.AUTO_PLAN_DEADLINE  # 計画を待つ最大フレーム数
+        self._pending = None  # 結果待ちの依頼番号
+        self._pending_frames = 0
+
+        # 時間予算つきの探索（指定時はスレッドを使わず、毎フレーム少しずつ進める）
+        # ビームサーチで選ぶので、ロールアウトで選ぶ時は使わない
+        self.anytime = None
+        self._searching = False
+        self._search_key = None
+        if Config.AUTO_PLAN_BUDGET_US > 0 and self.rollout is None:
+            beam = BeamSearch(self.search, self._score_placements,
+                              max(Config.AUTO_SEARCH_DEPTH, 1), Config.AUTO_BEAM_WIDTH)
+            self.anytime = AnytimePlanner(beam, Config.AUTO_PLAN_BUDGET_US)
+            self.worker = None
+
+        # 次のピースの先読み（予測どおりの状態で出現したら、待たずにその計画を使う）
+        # 先読みもビームサーチなので、ロールアウトで選ぶ時は使わない（先読みの手が優先されてしまう）
+        self.speculation = None
+        self._speculation_key = None
+        self.speculation_hits = 0
+        self.speculation_misses = 0
+        if Config.AUTO_SPECULATE_BUDGET_US > 0 and self.rollout is None:
+            beam = BeamSearch(self.search, self._score_placements,
+                              max(Config.AUTO_SEARCH_DEPTH, 1), Config.AUTO_BEAM_WIDTH)
+            self.speculation = AnytimePlanner(beam, Config.AUTO_SPECULATE_BUDGET_US)
+
+    @staticmethod
+    def shutdown():
+        """AutoPlayer で共有している資源（ロールアウトのプロセスプール）を解放する（アプリの終了時に呼ぶ）"""
+        from controller.rollout_planner import RolloutPlanner
+        RolloutPlanner.close_pool()
+
+    @staticmethod
+    def load_weights(path):
+        """tools/tune_weights.py が書き出した重みを読み込む（知らないキーは無視）"""
+        with open(path, "r") as f:
+            data = json.load(f)
+        weights = data.get("weights", data)
+        return {k: float(v) for k, v in weights.items() if k in AutoPlayer.WEIGHTS}
+
     # === 外部から毎フレーム呼ぶ ===
     def update(self):
         # カウントダウン中やゲームオーバーでは何もしない
         if self.game.countdown_active or self.game.is_game_over or self.game.game_over_triggered:
             self.plan.clear()
+            self._pending = None
+            self._stop_search()
+            self._stop_speculation()
             self._last_piece_obj = self.game.current_tetromino
+            if self.game.is_game_over or self.game.game_over_triggered:
+                self._report_stats()
             return
 
         # ピースが変わったら計画作り直し
         if self._last_piece_obj is not self.game.current_tetromino:
-            self.plan = self._make_plan()
+            self._stats_reported = False
+            self._request_plan()
             self._last_piece_obj = self.game.current_tetromino
             self.action_delay = self.spawn_delay  # 新しいピースが出現したら少し待つ
+            self._expected_pos = self._piece_pos()
 
-        # ディレイ中は何もしない
+        # バックグラウンドの計画を待つ（ディレイは待っている間も進める）
+        if self._pending is not None and not self._receive_plan():
+            if self.action_delay > 0:
+                self.action_delay -= 1
+            return
+
+        # 時間予算の中で探索を進める（ディレイは探索している間も進める）
+        if self._searching and not self._continue_search():
+            if self.action_delay > 0:
+                self.action_delay -= 1
+            return
+
+        # ディレイ中は次のピースを先読みする
         if self.action_delay > 0:
             self.action_delay -= 1
+            self._speculate()
             return
 
         # 計画が空なら、保険としてゆっくり落とす
@@ -50,9 +210,19 @@ class AutoPlayer:
                 self.game.move_down()
             return
 
+        # 重力で位置がずれていたら、今の位置から計画を作り直す
+        if self._piece_pos() != self._expected_pos and not self._drift_is_harmless():
+            self.plan = self._replan()
+            if not self.plan:
+                return
+
         # 次の操作を実行
+        piece = self.game.current_tetromino
         action = self.plan.pop(0)
-        self._apply(action)
+        if not self._apply(action) and self.game.current_tetromino is piece:
+            # 操作が失敗したら計画を作り直す
+            self.plan = self._replan()
+        self._expected_pos = self._piece_pos()
         
         # 操作後のディレイを設定
         if action in ["left", "right", "rotcw", "rotccw"]:
@@ -62,219 +232,368 @@ class AutoPlayer:
         elif action == "hold":
             self.action_delay = self.spawn_delay  # Hold後は新ピース待機と同じ
 
+    def _report_stats(self):
+        """計画のキャッシュの命中数（起動してからの累計）をログに出す（1ゲームに1回）"""
+        if self._stats_reported or self.plan_cache is None:
+            return
+        self._stats_reported = True
+        stats = self.plan_cache.stats()
+        print(f"AutoPlayer plan cache: {stats['hits']} hits / {stats['misses']} misses "
+              f"({stats['hit_rate']:.1%}), {stats['size']} plans")
+
     # === 計画作成 ===
-    def _make_plan(self):
-        piece = self.game.current_tetromino
-        board = self.game.board
-        if piece is None:
+    def _request_plan(self):
+        """新しいピースの計画を作る（バックグラウンドなら依頼だけして結果は後で受け取る）"""
+        if self.game.current_tetromino is None:
+            self._stop_speculation()
+            self._set_plan([], None)
+            self._pending = None
+            return
+
+        snapshot = PlanSnapshot.capture(self.game)
+        speculated = self._take_speculation(snapshot)
+        self._set_plan([], None)
+        if speculated is not None:
+            self._pending = None
+            self._set_plan(*speculated)
+            return
+        if self.anytime is not None:
+            self._start_search(snapshot)
+            return
+        if self.worker is None:
+            self._set_plan(*self._make_plan(snapshot))
+            return
+
+        self._pending = self.worker.submit(snapshot)
+        self._pending_frames = 0
+
+    def _receive_plan(self):
+        """バックグラウンドの計画を受け取る（まだ待つならFalse）"""
+        result = self.worker.poll(self._pending)
+        if result is None:
+            self._pending_frames += 1
+            if self._pending_frames < self.plan_deadline:
+                return False
+            # 期限切れなら依頼を取り消し、貪欲法ですぐに計画する
+            self.worker.cancel(self._pending)
+            result = self._make_greedy_plan(PlanSnapshot.capture(self.game))
+
+        self._set_plan(*result)
+        self._pending = None
+        return True
+
+    def _start_search(self, snapshot):
+        """時間予算つきの探索を始める（キャッシュにあればすぐに計画を使う）"""
+        self._stop_search()
+        if self.plan_cache is not None:
+            self._search_key = PlanCache.make_key(snapshot)
+            cached = self.plan_cache.get(self._search_key)
+            if cached is not None:
+                plan, placed = cached
+                self._set_plan(list(plan), placed)
+                return
+
+        self.anytime.start(snapshot)
+        self._searching = True
+        self._pending_frames = 0
+
+    def _continue_search(self):
+        """1フレーム分探索を進める（計画が決まったらTrue）
+
+        探索が終わるか、ディレイが終わった時点で最善手を実行する。
+        まだ深さ1も読めていなければ、期限のフレーム数までは待ち、それでも読めなければ貪欲法で計画する。
+        """
+        finished = self.anytime.step()
+        self._pending_frames += 1
+        if not finished:
+            if self.action_delay > 0:
+                return False
+            if self.anytime.depth_done == 0 and self._pending_frames < self.plan_deadline:
+                return False
+
+        if self.anytime.depth_done == 0:
+            plan, placed = self._make_greedy_plan(PlanSnapshot.capture(self.game))
+        else:
+            plan, placed = list(self.anytime.best_plan), self.anytime.best_placed
+        if finished and self.plan_cache is not None:
+            # 最後まで読めた計画だけを覚える
+            self.plan_cache.put(self._search_key, (tuple(plan), placed))
+        self._stop_search()
+        self._set_plan(plan, placed)
+        return True
+
+    def _stop_search(self):
+        if self._searching:
+            self.anytime.stop()
+            self._searching = False
+
+    def _set_plan(self, plan, placed):
+        """操作列と、その着地位置を覚える（Holdする計画では現在のピースの着地位置はない）"""
+        self.plan = plan
+        self._target = None
+        if placed is not None and plan[:1] != ["hold"]:
+            self._target = (placed.x, placed.y, placed.rotation)
+            self._start_speculation(placed)
+        else:
+            self._stop_speculation()
+
+    # === 次のピースの先読み ===
+    def _start_speculation(self, placed):
+        """現在のピースを placed に固定した盤面で、次のピースの計画を作り始める"""
+        self._stop_speculation()
+        if self.speculation is None:
+            return
+        predicted = PlanSnapshot.capture(self.game).predict_next(placed)
+        if predicted is None or not predicted.board.is_valid_position(predicted.piece):
+            return
+        self._speculation_key = PlanCache.make_key(predicted)
+        self.speculation.start(predicted)
+
+    def _speculate(self):
+        """空いたフレームで先読みを予算の分だけ進める"""
+        if self._speculation_key is not None:
+            self.speculation.step()
+
+    def _stop_speculation(self):
+        if self._speculation_key is not None:
+            self.speculation.stop()
+            self._speculation_key = None
+
+    def _take_speculation(self, snapshot):
+        """出現したピースが予測どおりなら、先読みした (操作列, 着地したピース) を返す
+
+        盤面のハッシュ・ピース・Hold・ネクスト（予測時に分かっていた分）がすべて一致した時だけ使う。
+        読み終わっていない先読みは捨てる。
+        """
+        key = self._speculation_key
+        if key is None:
+            return None
+        ready = self.speculation.finished and self.speculation.depth_done > 0
+        plan, placed = list(self.speculation.best_plan), self.speculation.best_placed
+        self._stop_speculation()
+
+        actual = PlanCache.make_key(snapshot)
+        queue = key[-1]
+        if not ready or actual[:-1] != key[:-1] or actual[-1][:len(queue)] != queue:
+            self.speculation_misses += 1
+            return None
+        self.speculation_hits += 1
+        return plan, placed
+
+    def _drift_is_harmless(self):
+        """重力で下がっただけで、まだ積んだブロックから離れた空いた領域にいれば計画はそのまま使える"""
+        x, y, rotation = self._piece_pos()
+        old_x, old_y, old_rotation = self._expected_pos
+        if (x, rotation) != (old_x, old_rotation) or y < old_y or "soft" in self.plan:
+            return False
+        return y < MoveSearch.get_free_y(self.game.board)
+
+    def _replan(self):
+        """実行中の計画を今の位置から作り直す"""
+        if self.game.current_tetromino is None:
             return []
+        snapshot = PlanSnapshot.capture(self.game)
+
+        # 同じ着地位置へ今の位置から向かう（重力で下がっても選んだ手は変えない）
+        if self._target is not None:
+            for placed, seq in self.search.find_placements(snapshot.board, snapshot.piece):
+                if (placed.x, placed.y, placed.rotation) == self._target:
+                    return list(seq)
+
+        # 届かなくなったら選び直す（バックグラウンドや時間予算つきの時はフレームを止めないよう貪欲法）
+        if self.worker is not None or self.anytime is not None:
+            plan, placed = self._make_greedy_plan(snapshot)
+        else:
+            plan, placed = self._make_plan(snapshot)
+        self._set_plan(plan, placed)
+        return plan
+
+    def _make_plan(self, snapshot):
+        """スナップショットから (操作列, 着地したピース) を作る（バックグラウンドのスレッドからも呼ばれる）"""
+        if self.plan_cache is None:
+            return self._search_plan(snapshot)
+
+        key = PlanCache.make_key(snapshot)
+        cached = self.plan_cache.get(key)
+        if cached is not None:
+            plan, placed = cached
+            return list(plan), placed
+
+        plan, placed = self._search_plan(snapshot)
+        self.plan_cache.put(key, (tuple(plan), placed))
+        return plan, placed
+
+    def _search_plan(self, snapshot):
+        """探索して計画を作る"""
+        if self.rollout is not None:
+            return self._make_rollout_plan(snapshot)
+        if self.beam is not None:
+            # ネクストとHoldを使って数手先まで読む
+            _, seq, placed = self.beam.find_plan(snapshot.board, snapshot.piece, snapshot.hold,
+                                                 snapshot.hold_used, snapshot.queue)
+            return seq, placed
+        return self._make_greedy_plan(snapshot)
+
+    def _make_greedy_plan(self, snapshot):
+        """現在のピースとHoldした場合のピースだけを見て最良手を (操作列, 着地したピース) で返す"""
+        board = snapshot.board
 
         # 現在のピースでの最良手を探索
-        current_best_score, current_best_seq = self._find_best_placement(piece)
+        current_best_score, current_best_seq, current_placed = self._find_best_placement(board, snapshot.piece)
         
         # Hold機能が使用可能かチェック
-        if not self.game.hold_used:
+        if not snapshot.hold_used:
             # Holdした場合の最良手を探索
-            hold_piece = self._get_hold_piece()
+            hold_piece = self._get_hold_piece(snapshot)
             if hold_piece is not None:
-                hold_best_score, hold_best_seq = self._find_best_placement(hold_piece)
+                hold_best_score, hold_best_seq, hold_placed = self._find_best_placement(board, hold_piece)
                 
                 # Holdした方が良いスコアなら、Holdを含めた計画にする
                 if hold_best_score is not None and (current_best_score is None or hold_best_score > current_best_score + 100):
                     # +100はHoldのコストとして若干の閾値を設ける
-                    return ["hold"] + hold_best_seq
+                    return ["hold"] + hold_best_seq, hold_placed
 
         # 現在のピースでの最良手を返す
-        return current_best_seq if current_best_score is not None else []
+        if current_best_score is None:
+            return [], None
+        return current_best_seq, current_placed
+
+    def _make_rollout_plan(self, snapshot):
+        """評価関数の上位の候補（Holdした場合も含む）をロールアウトで比べ、(操作列, 着地したピース) を返す"""
+        board = snapshot.board
+        queue = self.rollout.known_types(snapshot.queue)
 
-    def _get_hold_piece(self):
+        # (スコア, 操作列, 着地したピース, 後に来るテトロミノの種類)
+        options = [(snapshot.piece, [], 0, queue)]
+        if not snapshot.hold_used:
+            hold_piece = self._get_hold_piece(snapshot)
+            if hold_piece is not None:
+                # Holdが空ならネクストの先頭を使うので、後に来るのはその次から
+                rest = queue[1:] if snapshot.hold is None else queue
+                options.append((hold_piece, ["hold"], BeamSearch.HOLD_COST, rest))
+
+        candidates = []
+        for piece, prefix, cost, rest in options:
+            placements = self.search.find_placements(board, piece)
+            if not placements:
+                continue
+            scores = self._score_placements(board, [placed for placed, _ in placements])
+            for (placed, seq), score in zip(placements, scores):
+                candidates.append((score - cost, prefix + list(seq), placed, rest))
+        if not candidates:
+            return [], None
+
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        candidates = candidates[:self.rollout_candidates]
+        index = 0
+        if len(candidates) > 1:
+            index = self.rollout.choose(board, [c[2] for c in candidates], [c[3] for c in candidates])
+        _, seq, placed, _ = candidates[index]
+        return seq, placed
+
+    def _get_hold_piece(self, snapshot):
         """Hold後に出てくるピースを取得"""
-        if self.game.hold_tetromino is not None:
+        if snapshot.hold is not None:
             # すでにHoldがある場合は、それと交換
-            return self.game.hold_tetromino.copy()
-        elif len(self.game.next_tetrominos) > 0:
+            piece = snapshot.hold.copy()
+        elif len(snapshot.queue) > 0:
             # Holdが空の場合は、次のピースが来る
-            return self.game.next_tetrominos[0].copy()
-        return None
+            piece = snapshot.queue[0].copy()
+        else:
+            return None
 
-    def _find_best_placement(self, piece):
-        """指定されたピースの最良配置を探索"""
+        # Hold後のピースは出現位置から操作する
+        piece.x = snapshot.board.width // 2 - 2
+        piece.y = 0
+        return piece
+
+    def _find_best_placement(self, board, piece):
+        """指定されたピースの最良配置を (スコア, 操作列, 着地したピース) で返す"""
         if piece is None:
-            return None, []
-            
-        board = self.game.board
-        best = None
-        best_seq = []
-
-        # 試したい回転回数（0..3）を列挙
-        for rot in range(4):
-            # xの探索範囲（左右に少し余裕を持たせて無効は弾く）
-            for dst_x in range(-4, board.width + 4):
-                score, seq = self._simulate_and_score(piece, rot, dst_x)
-                if score is None:
-                    continue
-                if best is None or score > best:
-                    best, best_seq = score, seq
-
-        return best, best_seq
-
-    # === 1手シミュレーション ===
-    def _simulate_and_score(self, piece0, rot, dst_x):
-        """指定されたピースでシミュレーション"""
-        if piece0 is None:
-            return None, []
-
-        board = self.game.board
-        
-        # --- ピースのクローンを作成（盤面は直接使わない） ---
-        p = piece0.copy()
-        
-        # 指定回転へ（単純に時計回りrot回）
-        for _ in range(rot % 4):
-            p.rotate_clockwise()
-            if not self._is_valid_position_sim(p, board):
-                return None, []
-
-        # 指定xへ（衝突したら除外）
-        cur_x = p.x
-        dx = dst_x - cur_x
-        step = 1 if dx > 0 else -1
-        while dx != 0:
-            p.x += step
-            if not self._is_valid_position_sim(p, board):
-                return None, []
-            dx -= step
-
-        # 下へ落とす
-        while True:
-            p.y += 1
-            if not self._is_valid_position_sim(p, board):
-                p.y -= 1
-                break
-
-        # --- ここからクローン盤面を作成してロック ---
-        grid_clone = [row[:] for row in board.grid]
-        
-        # ピースを盤面にロック（クローン上で直接実行）
-        shape = p.get_shape()  # Tetrominoの形状を取得
-        tetromino_type = p.type + 1  # board.pyと同じロジック
-        
-        for block_y, row in enumerate(shape):
-            for block_x, cell in enumerate(row):
-                if cell:
-                    board_x = p.x + block_x
-                    board_y = p.y + block_y
-                    if 0 <= board_y < board.height and 0 <= board_x < board.width:
-                        grid_clone[board_y][board_x] = tetromino_type
-        
-        # 消去可能なライン数をカウント
-        lines_cleared = self._count_clearable_lines_from_grid(grid_clone, board.width, board.height)
-
-        # 盤面特徴量（クローンgridから計算）
-        heights = self._column_heights_from_grid(grid_clone, board.width, board.height)
-        agg_height = sum(heights)
-        holes = self._holes_from_grid(grid_clone, heights, board.width, board.height)
-        bumpiness = self._bumpiness(heights)
-        max_height = max(heights) if heights else 0
-
-        # スコア（調整しやすいようシンプルに線形）
-        score = (
-            1000 * lines_cleared
-            - 8   * holes
-            - 1.5 * agg_height
-            - 2.0 * bumpiness
-            - 0.5 * max_height
-        )
+            return None, [], None
 
-        # 実行用の操作列を作る（piece0の座標からの相対操作）
-        exec_seq = []
-        # 回転
-        exec_seq += ["rotcw"] * (rot % 4)
-        # 横移動
-        cur_x_real = piece0.x
-        if dst_x < cur_x_real:
-            exec_seq += ["left"] * (cur_x_real - dst_x)
-        elif dst_x > cur_x_real:
-            exec_seq += ["right"] * (dst_x - cur_x_real)
-        # ドロップ
-        exec_seq += ["hard"]
-
-        return score, exec_seq
-    
-    def _is_valid_position_sim(self, piece, board):
-        """シミュレーション用の衝突判定（Boardメソッドを呼ばない）"""
-        shape = piece.get_shape()
-        
-        for block_y, row in enumerate(shape):
-            for block_x, cell in enumerate(row):
-                if cell == 0:
-                    continue
-                    
-                x = piece.x + block_x
-                y = piece.y + block_y
-                
-                # 範囲外チェック
-                if x < 0 or x >= board.width or y < 0 or y >= board.height:
-                    return False
-                
-                # 既存ブロックとの衝突チェック
-                if y >= 0 and board.grid[y][x] != 0:
-                    return False
-        
-        return True
+        # 表面の形の表で決まればそれを使う
+        if self.skyline is not None:
+            found = self._find_table_placement(board, piece)
+            if found is not None:
+                return found
+
+        # 到達できる配置をすべて列挙（操作列は最短のもの）
+        candidates = self.search.find_placements(board, piece)
+        if not candidates:
+            return None, [], None
 
-    # === 低レベル評価関数 ===
-    def _count_clearable_lines_from_grid(self, grid, width, height):
-        """gridから直接消去可能なライン数をカウント"""
-        count = 0
-        for y in range(height):
-            if all(grid[y][x] != 0 for x in range(width)):
-                count += 1
-        return count
-
-    def _column_heights_from_grid(self, grid, width, height):
-        """gridから直接各列の高さを計算"""
-        heights = [0] * width
-        for x in range(width):
-            h = 0
-            for y in range(height):
-                if grid[y][x] != 0:
-                    h = height - y
-                    break
-            heights[x] = h
-        return heights
-
-    def _holes_from_grid(self, grid, heights, width, height):
-        """gridから直接穴の数をカウント"""
-        holes = 0
-        for x in range(width):
-            top = height - heights[x]
-            if top < 0:
-                top = height
-            for y in range(top + 1, height):
-                if grid[y][x] == 0:
-                    holes += 1
-        return holes
-
-    def _bumpiness(self, heights):
-        return sum(abs(heights[i] - heights[i+1]) for i in range(len(heights)-1))
+        # まとめて評価し、最初に見つかった最高スコアを選ぶ
+        scores = self._score_placements(board, [placed for placed, _ in candidates])
+        best_index = max(range(len(scores)), key=scores.__getitem__)
+
+        placed, seq = candidates[best_index]
+        return scores[best_index], list(seq), placed
+
+    def _find_table_placement(self, board, piece):
+        """スカイライン表の候補を実際の盤面で評価し、最良配置を (スコア, 操作列, 着地したピース) で返す
+
+        穴や張り出しがある、表にない形、どの候補にもまっすぐ届かない場合はNone（探索に任せる）。
+        """
+        if any(board.holes):
+            return None
+        candidates = []
+        for x, rotation in self.skyline.lookup(piece, board.heights):
+            found = self.search.find_drop(board, piece, x, rotation)
+            if found is not None:
+                candidates.append(found)
+        if not candidates:
+            return None
+
+        scores = self._score_placements(board, [placed for placed, _ in candidates])
+        best_index = max(range(len(scores)), key=scores.__getitem__)
+        placed, seq = candidates[best_index]
+        return scores[best_index], seq, placed
+
+    def _score_placements(self, board, pieces):
+        """落とした位置のピースをそれぞれ固定した場合のスコア一覧"""
+        if self.evaluator is not None:
+            # NumPyで全候補を一括評価
+            return self.evaluator.score_placements(board, pieces).tolist()
+
+        # 盤面を複製せず、差分更新済みの特徴量から評価
+        return [self._score_features(board.evaluate_placement(p)) for p in pieces]
+
+    def _score_features(self, features):
+        """盤面特徴量からスコアを計算（調整しやすいようシンプルに線形）"""
+        w = self.weights
+        return (
+            w["lines"]        * features["lines"]
+            + w["holes"]      * features["holes"]
+            + w["agg_height"] * features["agg_height"]
+            + w["bumpiness"]  * features["bumpiness"]
+            + w["max_height"] * features["max_height"]
+        )
 
     def _frame(self):
-        return pyxel.frame_count
+        return self.game.clock()
+
+    def _piece_pos(self):
+        piece = self.game.current_tetromino
+        if piece is None:
+            return None
+        return (piece.x, piece.y, piece.rotation)
 
     # === 実行（1フレ1手） ===
     def _apply(self, action):
+        """操作を実行する（移動・回転できなかったらFalse）"""
         if action == "left":
-            self.game.move_left()
+            return self.game.move_left()
         elif action == "right":
-            self.game.move_right()
+            return self.game.move_right()
         elif action == "rotcw":
-            self.game.rotate(clockwise=True)
+            return self.game.rotate(clockwise=True)
         elif action == "rotccw":
-            self.game.rotate(clockwise=False)
+            return self.game.rotate(clockwise=False)
         elif action == "soft":
-            self.game.move_down()
+            return self.game.move_down()
         elif action == "hard":
             self.game.hard_drop()
         elif action == "hold":
-            self.game.hold()
\ No newline at end of file
+            self.game.hold()
+        return True
\ No newline at end of file
@@ -0,0 +1,136 @@
+# controller/beam_search.py
+
+
+class BeamNode:
+    """ビームサーチの1状態（盤面・Hold・ネクストの位置・累積スコア・最初の1手）"""
+    __slots__ = ("board", "hold", "queue_index", "score", "first_seq", "first_placed")
+
+    def __init__(self, board, hold, queue_index, score, first_seq, first_placed):
+        self.board = board
+        self.hold = hold
+        self.queue_index = queue_index
+        self.score = score
+        self.first_seq = first_seq  # 最初の1手の操作列
+        self.first_placed = first_placed  # 最初の1手で着地したピース
+
+
+class BeamSearch:
+    """
+    ネクストとHoldを使って数手先まで読むビームサーチ。
+    - 各深さで「そのまま置く」「Holdと交換して置く」の両方を展開
+    - 累積スコアの上位 width 個だけを次の深さへ残す
+    - 同じ盤面・Hold・ネクスト位置になる状態は1つにまとめる
+    - 最良の葉にたどり着く最初の1手（操作列と着地位置）を返す
+    - iter_plan() なら少しずつ進められ、深さを1つ読み終えるごとにその時点の最善手がわかる
+    """
+    HOLD_COST = 100  # 最初の1手でHoldを使う場合のコスト（不要なHoldを避ける）
+    SCORE_CHUNK = 16  # iter_plan() で一度に評価する配置の数
+
+    def __init__(self, search, score_placements, depth=2, width=8):
+        self.search = search  # MoveSearch
+        self.score_placements = score_placements  # (board, pieces) -> スコア一覧
+        self.depth = depth
+        self.width = width
+        self.expanded = 0  # 直近の探索で評価した配置数
+
+    def find_plan(self, board, piece, hold, hold_used, queue):
+        """
+        最良の最初の1手を (スコア, 操作列, 着地したピース) で返す（置ける場所がなければ (None, [], None)）。
+        queue はネクストのテトロミノ一覧、hold はHold中のテトロミノ（なければNone）。
+        """
+        best = (None, [], None)
+        for result in self.iter_plan(board, piece, hold, hold_used, queue):
+            if result is not None:
+                best = result
+        return best
+
+    def iter_plan(self, board, piece, hold, hold_used, queue):
+        """
+        find_plan() を少しずつ進めるジェネレーター（反復深化）。
+        探索の途中では None を、深さを1つ読み終えるごとにその深さでの最善手を yield する。
+        """
+        self.expanded = 0
+        spawn_x = board.width // 2 - 2
+        root = BeamNode(board, hold, 0, 0, None, None)
+        beam = [root]
+
+        for depth in range(self.depth):
+            children = {}
+            for node in beam:
+                if depth == 0:
+                    current = piece
+                elif node.queue_index < len(queue):
+                    current = self._spawned(queue[node.queue_index], spawn_x)
+                    node = BeamNode(node.board, node.hold, node.queue_index + 1, node.score,
+                                    node.first_seq, node.first_placed)
+                else:
+                    continue  # これ以上先のピースはわからない
+
+                expanded = yield from self._expand(node, current, depth == 0 and hold_used, queue, spawn_x)
+                for child in expanded:
+                    # 同じ状態になる手は累積スコアの高い方だけ残す
+                    key = (child.board.zobrist, self._hold_key(child.hold), child.queue_index)
+                    other = children.get(key)
+                    if other is None or child.score > other.score:
+                        children[key] = child
+
+            if not children:
+                break
+            beam = sorted(children.values(), key=lambda n: n.score, reverse=True)[:self.width]
+            best = beam[0]
+            yield best.score, list(best.first_seq), best.first_placed
+
+    def _expand(self, node, current, hold_used, queue, spawn_x):
+        """1手分の子ノードを作る（そのまま置く手と、Holdと交換して置く手。ジェネレーター）"""
+        options = [(current, node.hold, node.queue_index, [])]
+        if not hold_used:
+            if node.hold is not None:
+                options.append((self._spawned(node.hold, spawn_x, keep_rotation=True),
+                                current, node.queue_index, ["hold"]))
+            elif node.queue_index < len(queue):
+                options.append((self._spawned(queue[node.queue_index], spawn_x),
+                                current, node.queue_index + 1, ["hold"]))
+
+        scored = []
+        for active, hold, queue_index, prefix in options:
+            candidates = yield from self.search.iter_placements(node.board, active)
+            if not candidates:
+                continue
+            pieces = [placed for placed, _ in candidates]
+            scores = []
+            for i in range(0, len(pieces), self.SCORE_CHUNK):
+                scores.extend(self.score_placements(node.board, pieces[i:i + self.SCORE_CHUNK]))
+                yield None
+            self.expanded += len(candidates)
+            cost = self.HOLD_COST if prefix and node.first_seq is None else 0
+            for (placed, seq), score in zip(candidates, scores):
+                scored.append((node.score + score - cost, placed, seq, hold, queue_index, prefix))
+
+        # 1つのノードから次の深さに残れるのは最大 width 個なので、盤面を作るのは上位だけ
+        scored.sort(key=lambda c: c[0], reverse=True)
+
+        children = []
+        for score, placed, seq, hold, queue_index, prefix in scored[:self.width]:
+            yield None
+            board = node.board.copy(with_grid=False)
+            board.lock_tetromino(placed)
+            board.clear_lines()
+            if node.first_seq is None:
+                children.append(BeamNode(board, hold, queue_index, score, prefix + seq, placed))
+            else:
+                children.append(BeamNode(board, hold, queue_index, score, node.first_seq, node.first_placed))
+        return children
+
+    def _spawned(self, piece, spawn_x, keep_rotation=False):
+        """出現位置に置いたテトロミノのコピー（Holdから出したピースは回転状態を保つ）"""
+        p = piece.copy()
+        p.x = spawn_x
+        p.y = 0
+        if not keep_rotation:
+            p.rotation = 0
+        return p
+
+    def _hold_key(self, hold):
+        if hold is None:
+            return None
+        return (hold.shape, hold.rotation)
@@ -0,0 +1,156 @@
+# controller/move_search.py
+from collections import deque
+
+from model.engine import GameEngine
+
+
+class MoveSearch:
+    """
+    到達できる配置を幅優先探索で列挙する。
+    - 状態は (x, y, 回転)。左右移動・ソフトドロップ・左右回転（SRSの壁蹴りつき）で遷移
+    - 訪問済みの状態は展開しない（トランスポジション集合）
+    - 各状態からハードドロップした着地位置を配置候補とし、最短の操作列を記録
+    - ブロックより上の空いた領域では上下の位置で到達先が変わらないので、
+      ソフトドロップは壁蹴りが届く高さまで一度に下げる
+    """
+    # 1手で遷移する操作（BFSの展開順。同じ手数なら先の操作が優先される）
+    MOVES = ("left", "right", "rotcw", "rotccw", "soft")
+
+    # テトロミノ（4x4以内）の最下段 + 壁蹴りで下がる最大の段数
+    FREE_MARGIN = 3 + 2
+
+    # iter_placements() が途中経過を返す間隔（展開した状態数）
+    STEP_STATES = 8
+
+    def __init__(self):
+        self.expanded = 0  # 直近の探索で展開した状態数
+
+    def find_placements(self, board, piece0):
+        """
+        到達できる配置を [(着地したピース, 操作列), ...] で返す。
+        操作列は piece0 の状態からの入力で、最後は必ず "hard"。
+        """
+        steps = self.iter_placements(board, piece0)
+        while True:
+            try:
+                next(steps)
+            except StopIteration as stop:
+                return stop.value
+
+    def iter_placements(self, board, piece0):
+        """
+        find_placements() を少しずつ進めるジェネレーター。
+        STEP_STATES 個の状態を展開するごとに None を yield し、最後に配置の一覧を return する。
+        """
+        p = piece0.copy()
+        start = (p.x, p.y, p.rotation)
+        if not board.is_valid_position(p):
+            return []
+
+        can_rotate = p.type != 3  # Oテトロミノは回転しない
+        free_y = MoveSearch.get_free_y(board)
+        parents = {start: None}  # 状態 -> (直前の状態, 操作)
+        landings = {}  # 着地状態 -> ハードドロップを入力する状態
+        queue = deque([start])
+
+        popped = 0
+        while queue:
+            popped += 1
+            if popped % MoveSearch.STEP_STATES == 0:
+                yield None
+            state = queue.popleft()
+            x, y, rotation = state
+
+            # ハードドロップした場合の着地位置（最初に見つかったものが最短）
+            p.x, p.y, p.rotation = x, y, rotation
+            landing = (x, board.get_landing_y(p), rotation)
+            if landing not in landings:
+                landings[landing] = state
+
+            for move in MoveSearch.MOVES:
+                if move == "left":
+                    next_state = (x - 1, y, rotation)
+                elif move == "right":
+                    next_state = (x + 1, y, rotation)
+                elif move == "soft":
+                    next_state = (x, max(y + 1, free_y), rotation)
+                elif can_rotate:
+                    next_state = self._rotate(board, p, x, y, rotation, move == "rotcw")
+                else:
+                    continue
+
+                if next_state is None or next_state in parents:
+                    continue  # 到達済みの状態は判定し直さない
+                if move in ("left", "right", "soft") and not self._fits(board, p, next_state):
+                    continue
+                parents[next_state] = (state, move)
+                queue.append(next_state)
+
+        self.expanded = len(parents)
+
+        placements = []
+        for (x, y, rotation), state in landings.items():
+            placed = piece0.copy()
+            placed.x, placed.y, placed.rotation = x, y, rotation
+            placements.append((placed, self._build_path(parents, state) + ["hard"]))
+        return placements
+
+    def find_drop(self, board, piece0, x, rotation):
+        """
+        回転してから横に移動し、まっすぐ落として (x, 回転) に置く操作列を探す。
+        (着地したピース, 操作列) を返す（途中でぶつかる、壁蹴りでずれて届かない場合はNone）。
+        """
+        p = piece0.copy()
+        if not board.is_valid_position(p):
+            return None
+        seq = []
+        if rotation != p.rotation:
+            if p.type == 3:
+                return None  # Oテトロミノは回転しない
+            clockwise = (rotation - p.rotation) % 4 <= 2
+            while p.rotation != rotation:
+                state = self._rotate(board, p, p.x, p.y, p.rotation, clockwise)
+                if state is None:
+                    return None
+                p.x, p.y, p.rotation = state
+                seq.append("rotcw" if clockwise else "rotccw")
+
+        step, move = (1, "right") if x > p.x else (-1, "left")
+        while p.x != x:
+            if not self._fits(board, p, (p.x + step, p.y, p.rotation)):
+                return None
+            seq.append(move)
+
+        p.y = board.get_landing_y(p)
+        seq.append("hard")
+        return p, seq
+
+    @staticmethod
+    def get_free_y(board):
+        """この y より上なら、ピースも壁蹴り先も空いた行だけにある（上下に動かしても到達先が同じ）"""
+        return board.height - max(board.heights) - MoveSearch.FREE_MARGIN
+
+    def _fits(self, board, p, state):
+        """状態の位置にピースを置けるか"""
+        p.x, p.y, p.rotation = state
+        return board.is_valid_position(p)
+
+    def _rotate(self, board, p, x, y, rotation, clockwise):
+        """GameEngine.rotate と同じ壁蹴りで回転した状態（回転できなければNone）"""
+        new_rotation = (rotation + (1 if clockwise else -1)) % 4
+        for dx, dy in GameEngine.get_srs_offsets(rotation, new_rotation, p.type):
+            state = (x + dx, y + dy, new_rotation)
+            if self._fits(board, p, state):
+                return state
+        return None
+
+    def _build_path(self, parents, state):
+        """親をたどって開始状態からの操作列を作る"""
+        path = []
+        while parents[state] is not None:
+            y = state[1]
+            state, move = parents[state]
+            # 空いた領域をまとめて下げたソフトドロップは段数分の入力にする
+            path.extend([move] * (y - state[1] if move == "soft" else 1))
+        path.reverse()
+        return path
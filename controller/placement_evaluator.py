@@ -0,0 +1,64 @@
+# controller/placement_evaluator.py
+import numpy as np
+
+
+class PlacementEvaluator:
+    """
+    配置候補をNumPyで一括評価する。
+    - 全候補の「ピース固定後の盤面」を (候補数, 高さ, 幅) の配列に積み重ねる
+    - 消去ライン数・列の高さ・穴・凸凹を配列演算でまとめて計算
+    - 特徴量はBoard.evaluate_placementと同じ定義（ライン消去前の盤面）
+    """
+    def __init__(self, weights):
+        self.weights = weights
+
+    def score_placements(self, board, pieces):
+        """落とした位置のピース一覧を受け取り、スコアの配列を返す"""
+        boards = self._stack_boards(board, pieces)
+        lines, agg_height, holes, bumpiness, max_height = self._features(boards)
+
+        w = self.weights
+        return (
+            w["lines"]        * lines
+            + w["holes"]      * holes
+            + w["agg_height"] * agg_height
+            + w["bumpiness"]  * bumpiness
+            + w["max_height"] * max_height
+        )
+
+    def _stack_boards(self, board, pieces):
+        """候補ごとにピースを固定した盤面を積み重ねた bool 配列を作る"""
+        # ビットボードの各行を列ごとのbool配列に展開
+        rows = np.array(board.rows, dtype=np.int64)
+        base = ((rows[:, None] >> np.arange(board.width)) & 1).astype(bool)
+        boards = np.repeat(base[None, :, :], len(pieces), axis=0)
+
+        # 全候補のピースのセルをまとめて書き込む
+        index, ys, xs = [], [], []
+        for i, p in enumerate(pieces):
+            for dx, dy in p.get_cells():
+                index.append(i)
+                ys.append(p.y + dy)
+                xs.append(p.x + dx)
+        boards[index, ys, xs] = True
+        return boards
+
+    def _features(self, boards):
+        """積み重ねた盤面から特徴量の配列を計算"""
+        height = boards.shape[1]
+
+        # 埋まった行の数
+        lines = boards.all(axis=2).sum(axis=1)
+
+        # 列の高さ（最上段のブロックから床まで）
+        has_block = boards.any(axis=1)
+        top = boards.argmax(axis=1)
+        heights = np.where(has_block, height - top, 0)
+
+        # 穴（最上段より下の空白）= 高さ - 列のブロック数
+        holes = (heights - boards.sum(axis=1)).sum(axis=1)
+
+        agg_height = heights.sum(axis=1)
+        bumpiness = np.abs(np.diff(heights, axis=1)).sum(axis=1)
+        max_height = heights.max(axis=1)
+        return lines, agg_height, holes, bumpiness, max_height
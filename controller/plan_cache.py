@@ -0,0 +1,60 @@
+# controller/plan_cache.py
+from collections import OrderedDict
+import threading
+
+
+class PlanCache:
+    """
+    作成済みの計画を覚えておくLRUキャッシュ。
+    - キーは盤面のZobristハッシュと、現在のピース・Hold・ネクストの状態
+    - capacity 件を超えたら最も古く使われた計画から捨てる
+    - hits / misses で効果を確認できる
+    - 計画スレッドとメインスレッドの両方から使うのでロックで保護する
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(snapshot):
+        """PlanSnapshot からキーを作る"""
+        def piece_key(t):
+            return None if t is None else (t.shape, t.rotation, t.x, t.y)
+
+        return (
+            snapshot.board.zobrist,
+            piece_key(snapshot.piece),
+            piece_key(snapshot.hold),
+            snapshot.hold_used,
+            tuple((t.shape, t.rotation) for t in snapshot.queue),
+        )
+
+    def get(self, key):
+        """キーに対応する計画を返す（なければNone）"""
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        """件数と命中数（デバッグ表示やログ用）"""
+        return {"size": len(self.entries), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hit_rate()}
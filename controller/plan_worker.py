@@ -0,0 +1,71 @@
+# controller/plan_worker.py
+import threading
+
+
+class PlanWorker:
+    """
+    計画作成をバックグラウンドのスレッドで行う。
+    - submit() で状態のスナップショットを渡し、poll() で出来上がった計画を受け取る
+    - 計画中に新しい依頼が来たら、古い依頼の結果は捨てる
+    - 待つのをやめた依頼は cancel() で取り消す（まだ始まっていなければ計画しない）
+    - スレッドは最初の依頼で起動する（デーモンスレッドなので終了処理は不要）
+    """
+    def __init__(self, plan_func):
+        self.plan_func = plan_func  # スナップショット -> 操作列
+        self.lock = threading.Lock()
+        self.event = threading.Event()
+        self.thread = None
+
+        self._next_id = 0
+        self._request = None  # (依頼番号, スナップショット)
+        self._result = None   # (依頼番号, 操作列)
+        self._cancelled = 0   # 取り消された依頼番号
+
+    def submit(self, snapshot):
+        """計画を依頼して依頼番号を返す"""
+        with self.lock:
+            self._next_id += 1
+            self._request = (self._next_id, snapshot)
+            request_id = self._next_id
+
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+        self.event.set()
+        return request_id
+
+    def poll(self, request_id):
+        """依頼した計画ができていれば返す（まだならNone）"""
+        with self.lock:
+            if self._result is not None and self._result[0] == request_id:
+                plan = self._result[1]
+                self._result = None
+                return plan
+        return None
+
+    def cancel(self, request_id):
+        """依頼を取り消す（計画中なら結果を捨てる。実行中の計画そのものは止められない）"""
+        with self.lock:
+            if self._request is not None and self._request[0] == request_id:
+                self._request = None
+            if self._result is not None and self._result[0] == request_id:
+                self._result = None
+            self._cancelled = request_id
+
+    def _run(self):
+        while True:
+            self.event.wait()
+            with self.lock:
+                request = self._request
+                self._request = None
+                self.event.clear()
+            if request is None:
+                continue
+
+            request_id, snapshot = request
+            plan = self.plan_func(snapshot)
+
+            with self.lock:
+                # 計画中に次の依頼が来ておらず、取り消されてもいなければ結果を渡す
+                if self._request is None and self._cancelled != request_id:
+                    self._result = (request_id, plan)
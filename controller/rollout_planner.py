@@ -0,0 +1,257 @@
+# controller/rollout_planner.py
+import atexit
+import math
+import multiprocessing
+import random
+import threading
+import time
+
+from model.board import Board
+from model.randomizer import PieceGenerator
+from model.tetromino import Tetromino
+
+
+def _score(weights, features):
+    """盤面特徴量の線形スコア"""
+    return sum(w * features[k] for k, w in weights.items())
+
+
+def _load_board(rows, width, height):
+    """行のビットマスクから盤面を作る（種別は区別しない）"""
+    board = Board(width, height)
+    board.load_grid([[row >> x & 1 for x in range(width)] for row in rows])
+    return board
+
+
+def _choose_drop(board, piece, weights, epsilon, rng):
+    """出現位置からまっすぐ落とせる配置のうち最良のもの（epsilon の確率でランダム）と、その特徴量を返す"""
+    drops = []
+    rotations = (0,) if piece.type == 3 else range(4)  # Oテトロミノは回転しない
+    for rotation in rotations:
+        piece.rotation = rotation
+        left, _, right, _ = piece.get_bounds()
+        for x in range(-left, board.width - right):
+            piece.x, piece.y = x, 0
+            if not board.is_valid_position(piece):
+                continue
+            piece.y = board.get_landing_y(piece)
+            drops.append((x, piece.y, rotation))
+    if not drops:
+        return None, None
+
+    if rng.random() < epsilon:
+        drops = [rng.choice(drops)]
+
+    best, best_score, best_features = None, None, None
+    for x, y, rotation in drops:
+        piece.x, piece.y, piece.rotation = x, y, rotation
+        features = board.evaluate_placement(piece)
+        score = _score(weights, features)
+        if best_score is None or score > best_score:
+            best, best_score, best_features = (x, y, rotation), score, features
+    piece.x, piece.y, piece.rotation = best
+    return piece, best_features
+
+
+def _rollout_batch(task):
+    """プロセスプールで実行するロールアウトのまとまり（盤面の価値の一覧を返す）
+
+    既知のネクストの後はランダムなテトロミノを depth 個まで置き、
+    消したライン数の得点と、最後の盤面の評価（ライン数を除く）の和を価値とする。
+    """
+    rows, width, height, queue, seeds, settings = task
+    weights, depth, epsilon, mode, topout_penalty = settings
+    static_weights = {k: w for k, w in weights.items() if k != "lines"}
+    base = _load_board(rows, width, height)
+
+    values = []
+    for seed in seeds:
+        board = base.copy(with_grid=False)
+        generator = PieceGenerator(seed, mode)
+        rng = random.Random(seed)
+        value = 0.0
+        features = None
+        for step in range(depth):
+            piece_type = queue[step] if step < len(queue) else generator.next_type()
+            piece = Tetromino.create(piece_type)
+            piece.x = width // 2 - 2
+            if not board.is_valid_position(piece):
+                value += topout_penalty
+                features = None
+                break
+            piece, features = _choose_drop(board, piece, weights, epsilon, rng)
+            if piece is None:
+                value += topout_penalty
+                features = None
+                break
+            board.lock_tetromino(piece)
+            value += weights["lines"] * len(board.clear_lines())
+        if features is not None:
+            value += _score(static_weights, features)
+        values.append(value)
+    return values
+
+
+class RolloutPlanner:
+    """
+    モンテカルロ・ロールアウトで配置を選ぶ。
+    - 候補ごとに、その配置を固定した盤面からランダムなテトロミノ列で数手先まで貪欲に遊ばせ、価値の平均で比べる
+    - 同じラウンドでは全候補に同じシードを使い（共通乱数）、運の差で比べないようにする
+    - ラウンドごとに信頼区間が先頭の候補と重ならなくなった候補は打ち切る
+    - ロールアウトはプロセスプールに分配する（workers=0 ならこのプロセスで実行）
+    - プロセスプールは最初のロールアウトで作り、すべての RolloutPlanner で共有する
+      （forkserver か spawn で起動するので、pyxel やカメラのスレッドを複製しない）
+    - デーモンプロセス（チューニングやベンチマークのプールの中）では子プロセスを作れないので、このプロセスで実行する
+    - 回数・深さ・プロセス数・時間で強さと計算量を調整できる
+    - 直前のラウンドで測った1回あたりの時間から、残りの時間に収まるようにラウンドの回数を決める
+    """
+    BATCH = 8  # 1タスクで行うロールアウトの最大回数
+    FIRST_BATCH = 2  # 最初のラウンドで1タスクが行う回数（1回あたりの時間を測るため少なめ）
+    MIN_BATCHES = 2  # 打ち切りを判断する前に最低限行うラウンド数
+    Z = 1.96  # 信頼区間の幅（95%）
+    EPSILON = 0.1  # ロールアウト中にランダムな手を選ぶ確率
+    TOPOUT_PENALTY = -10000  # ロールアウト中にゲームオーバーになった時の価値
+
+    _pool = None  # 共有のプロセスプール
+    _pool_lock = threading.Lock()
+
+    def __init__(self, weights, rollouts, depth, workers, time_ms, mode):
+        self.weights = dict(weights)
+        self.rollouts = rollouts  # 候補ごとの最大回数
+        self.depth = depth
+        self.time_ms = time_ms
+        self.mode = mode  # ロールアウトで使うテトロミノの出し方
+        self.workers = workers
+        if multiprocessing.current_process().daemon:
+            self.workers = 0
+        self.last_rollouts = 0  # 直近の選択で行ったロールアウトの回数
+
+    @staticmethod
+    def known_types(pieces):
+        """ロールアウトで再現できる既知のテトロミノの種類の並び
+
+        カメラで作ったピース（種類が7以上、または種類と形が一致しない）は種類の番号から作り直せないので、
+        その手前で打ち切り、以降はロールアウトの乱数で補う。
+        """
+        types = []
+        for piece in pieces:
+            if piece.type >= len(Tetromino.SHAPE_SETS) or piece.shape is not Tetromino.SHAPE_SETS[piece.type]:
+                break
+            types.append(piece.type)
+        return types
+
+    @staticmethod
+    def get_pool(workers):
+        """共有のプロセスプールを返す（なければ workers 個のプロセスで作る）"""
+        with RolloutPlanner._pool_lock:
+            if RolloutPlanner._pool is None:
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                RolloutPlanner._pool = context.Pool(workers)
+                atexit.register(RolloutPlanner.close_pool)
+            return RolloutPlanner._pool
+
+    @staticmethod
+    def close_pool():
+        """共有のプロセスプールを閉じる（終了時に呼ぶ）"""
+        with RolloutPlanner._pool_lock:
+            if RolloutPlanner._pool is not None:
+                RolloutPlanner._pool.terminate()
+                RolloutPlanner._pool.join()
+                RolloutPlanner._pool = None
+
+    def choose(self, board, placements, queues):
+        """
+        placements（着地したピース）のうち価値の平均が最も高いものの番号を返す。
+        queues は候補ごとの、その配置の後に来る既知のテトロミノの種類の並び。
+        placements は評価関数の良い順に並べておく（時間内に1回もロールアウトできなければ0を返す）。
+        """
+        deadline = time.perf_counter() + self.time_ms / 1000
+        settings = (self.weights, self.depth, RolloutPlanner.EPSILON, self.mode,
+                    RolloutPlanner.TOPOUT_PENALTY)
+
+        # 配置を固定した盤面と、その時に消えるラインの得点
+        tasks = []
+        immediate = []
+        for placed, queue in zip(placements, queues):
+            after = board.copy(with_grid=False)
+            after.lock_tetromino(placed)
+            immediate.append(self.weights["lines"] * len(after.clear_lines()))
+            tasks.append((tuple(after.rows), after.width, after.height, tuple(queue)))
+
+        values = [[] for _ in placements]
+        active = list(range(len(placements)))
+        seed_base = board.zobrist & 0xFFFFFFFF
+        done = 0  # 候補ごとに行ったロールアウトの回数
+        round_index = 0
+        self.last_rollouts = 0
+        rate = None  # 1つのプロセスでロールアウト1回にかかる時間（秒）
+        while len(active) > 1 and done < self.rollouts:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+
+            # 候補が減ったらそのぶん1ラウンドの回数を増やし、プロセスを遊ばせない
+            chunks = max(1, self.workers // len(active))
+            waves = -(-len(active) * chunks // max(self.workers, 1))  # 全タスクを流し終えるまでの巡回数
+            per_task = min(RolloutPlanner.BATCH, -(-(self.rollouts - done) // chunks))
+            if rate is None:
+                per_task = min(per_task, RolloutPlanner.FIRST_BATCH)
+            else:
+                per_task = min(per_task, int(remaining / (waves * rate)))
+                if per_task < 1:
+                    break  # 1回ずつでも残りの時間に収まらない
+            count = min(per_task * chunks, self.rollouts - done)
+            seed_chunks = [range(seed_base + done + k, seed_base + min(done + k + per_task, done + count))
+                           for k in range(0, count, per_task)]
+            batch = [(i, tasks[i] + (seeds, settings)) for i in active for seeds in seed_chunks]
+
+            start = time.perf_counter()
+            if self.workers > 0:
+                # 見積もりが外れても残りの時間を超えて待たない（打ち切ったタスクの結果は捨てる）
+                pool = RolloutPlanner.get_pool(self.workers)
+                pending = pool.map_async(_rollout_batch, [task for _, task in batch], chunksize=1)
+                try:
+                    results = pending.get(timeout=deadline - start)
+                except multiprocessing.TimeoutError:
+                    break
+            else:
+                results = [_rollout_batch(task) for _, task in batch]
+            rate = (time.perf_counter() - start) / (waves * per_task)
+
+            for (i, _), result in zip(batch, results):
+                values[i].extend(result)
+                self.last_rollouts += len(result)
+            done += count
+            round_index += 1
+
+            if round_index >= RolloutPlanner.MIN_BATCHES:
+                active = self._prune(active, values, immediate)
+
+        if done == 0:
+            return 0
+        return max(active, key=lambda i: immediate[i] + RolloutPlanner._mean(values[i]))
+
+    def _prune(self, active, values, immediate):
+        """信頼区間の上限が、先頭の候補の下限に届かない候補を外す"""
+        bounds = {}
+        for i in active:
+            mean = immediate[i] + RolloutPlanner._mean(values[i])
+            margin = RolloutPlanner.Z * RolloutPlanner._stderr(values[i])
+            bounds[i] = (mean - margin, mean, mean + margin)
+        leader = max(active, key=lambda i: bounds[i][1])
+        return [i for i in active if i == leader or bounds[i][2] >= bounds[leader][0]]
+
+    @staticmethod
+    def _mean(values):
+        return sum(values) / len(values) if values else 0.0
+
+    @staticmethod
+    def _stderr(values):
+        """平均の標準誤差"""
+        n = len(values)
+        if n < 2:
+            return float("inf")
+        mean = sum(values) / n
+        variance = sum((v - mean) ** 2 for v in values) / (n - 1)
+        return math.sqrt(variance / n)
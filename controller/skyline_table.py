@@ -0,0 +1,109 @@
+# controller/skyline_table.py
+import json
+import mmap
+import struct
+
+from model.tetromino import Tetromino
+
+
+class SkylineTable:
+    """
+    盤面の表面の形（スカイライン）から配置の候補を引く表。
+    - キーはテトロミノの種類と、隣り合う列の高さの差を ±clip に切り詰めた並び
+    - 値は表面だけで評価して良い順に並べた (x, 回転) の候補（最大 top_k 個、1候補1バイト）
+    - tools/build_skyline_table.py で作ったファイルを mmap で読む（起動が速く、複数の盤面で共有できる）
+    - 穴や張り出しのある盤面やカメラで作ったテトロミノは表では決まらないので、呼び出し側で探索に切り替える
+    """
+    MAGIC = b"SKYT"
+    VERSION = 1
+    # magic, version, 盤面の幅, clip, top_k, メタ情報（JSON）の長さ
+    HEADER = struct.Struct("<4sHHHHI")
+    EMPTY = 0xFF  # 候補がtop_k個に満たない時の埋め草
+    X_OFFSET = 2  # x は負の値もとるので、ずらして1バイトに詰める
+
+    # パス -> 読み込み済みの表（同じファイルは1回だけマップする）
+    _tables = {}
+
+    def __init__(self, data, width, clip, top_k, meta, offset):
+        self.data = data
+        self.width = width
+        self.clip = clip
+        self.top_k = top_k
+        self.meta = meta
+        self.weights = meta.get("weights", {})  # 表を作った時の評価関数の重み
+        self.offset = offset  # 候補の並びの開始位置
+        self.contours = SkylineTable.contour_count(width, clip)
+
+    @staticmethod
+    def load(path):
+        """表のファイルを mmap で開く（形式が違えば ValueError）"""
+        table = SkylineTable._tables.get(path)
+        if table is not None:
+            return table
+
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, width, clip, top_k, meta_size = SkylineTable.HEADER.unpack_from(data, 0)
+        if magic != SkylineTable.MAGIC or version != SkylineTable.VERSION:
+            data.close()
+            raise ValueError(f"not a skyline table: {path}")
+
+        offset = SkylineTable.HEADER.size + meta_size
+        meta = json.loads(data[SkylineTable.HEADER.size:offset].decode("utf-8"))
+        table = SkylineTable(data, width, clip, top_k, meta, offset)
+        expected = offset + len(Tetromino.SHAPE_SETS) * table.contours * top_k
+        if len(data) != expected:
+            data.close()
+            raise ValueError(f"skyline table is truncated: {path}")
+
+        SkylineTable._tables[path] = table
+        return table
+
+    @staticmethod
+    def write(path, width, clip, top_k, meta, body):
+        """表をファイルに書き出す（body は種類・輪郭の順に並べた候補のバイト列）"""
+        meta_bytes = json.dumps(meta).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(SkylineTable.HEADER.pack(SkylineTable.MAGIC, SkylineTable.VERSION,
+                                             width, clip, top_k, len(meta_bytes)))
+            f.write(meta_bytes)
+            f.write(body)
+
+    @staticmethod
+    def contour_count(width, clip):
+        """輪郭の種類の数"""
+        return (2 * clip + 1) ** (width - 1)
+
+    @staticmethod
+    def contour_index(heights, clip):
+        """列の高さから輪郭の番号を求める（隣との差を ±clip に切り詰めた 2*clip+1 進数）"""
+        base = 2 * clip + 1
+        index = 0
+        for left, right in zip(heights, heights[1:]):
+            diff = right - left
+            if diff > clip:
+                diff = clip
+            elif diff < -clip:
+                diff = -clip
+            index = index * base + diff + clip
+        return index
+
+    @staticmethod
+    def encode(x, rotation):
+        return (x + SkylineTable.X_OFFSET) << 2 | rotation
+
+    def lookup(self, piece, heights):
+        """ピースの種類と列の高さから、良い順の [(x, 回転), ...] を返す（表にない形なら空）"""
+        if len(heights) != self.width or not 0 <= piece.type < len(Tetromino.SHAPE_SETS):
+            return []
+        if piece.shape is not Tetromino.SHAPE_SETS[piece.type]:
+            return []  # カメラで作った形
+
+        index = piece.type * self.contours + SkylineTable.contour_index(heights, self.clip)
+        start = self.offset + index * self.top_k
+        moves = []
+        for code in self.data[start:start + self.top_k]:
+            if code == SkylineTable.EMPTY:
+                break
+            moves.append(((code >> 2) - SkylineTable.X_OFFSET, code & 3))
+        return moves
@@ -1,5 +1,8 @@
+import argparse
 import pyxel
-from model.game import Game
+from model.game import Game, PyxelAudio
+from model.engine import GameEngine
+from model.replay import Replay, ReplayRecorder, ReplayPlayer
 from model.ranking import Ranking
 from controller.input_handler import InputHandler
 from controller.auto_player import AutoPlayer
@@ -16,7 +19,7 @@ if Config.CAMERA:
 
 
 class TetrisApp:
-    def __init__(self):
+    def __init__(self, replay_path=None, replay_speed=1.0):
         # 画面の解像度を設定
         pyxel.init(Config.SCREEN_CAMERA_WIDTH if Config.CAMERA else Config.SCREEN_WIDTH, 
                     Config.SCREEN_WIDTH, title="HITORIS", fps=60)
@@ -57,7 +60,23 @@ class TetrisApp:
         self.controller = GameController(self.game)
         self.auto_player = AutoPlayer(self.game)
         
-        # グローバルアクセス用（エフェクト登録用）
+        # ライン消去エフェクトの出力先
+        self.game.set_effects(self.game_view)
+
+        # リプレイの記録
+        if Config.REPLAY_DIR:
+            self.game.set_recorder(ReplayRecorder(Config.REPLAY_DIR))
+
+        # リプレイ再生モード
+        self.replay_player = None
+        self.replay_speed = replay_speed
+        if replay_path:
+            engine = GameEngine(audio=PyxelAudio(), effects=self.game_view)
+            self.replay_player = ReplayPlayer(Replay.load(replay_path), engine)
+            self.is_title_screen = False
+            self.is_loading = False
+
+        # グローバルアクセス用
         pyxel.APP = self
 
         self.idle_timer = 0
@@ -69,8 +88,14 @@ class TetrisApp:
     def update(self):
         # ESCキーでゲーム終了
         if pyxel.btnp(pyxel.KEY_ESCAPE):
+            AutoPlayer.shutdown()
             pyxel.quit()
 
+        # リプレイ再生中
+        if self.replay_player is not None:
+            self.replay_player.advance(self.replay_speed)
+            return
+
         # ローディング画面の処理
         if self.is_loading:
             self.loading_view.update() 
@@ -218,7 +243,9 @@ class TetrisApp:
     def draw(self):
         pyxel.cls(0)
         
-        if self.is_loading:
+        if self.replay_player is not None:
+            self.game_view.draw(self.replay_player.engine)
+        elif self.is_loading:
             self.loading_view.draw()
         elif self.is_name_entry:
             self.name_entry_view.draw(self.game.score, self.game.lines_cleared, self.new_rank)
@@ -230,4 +257,9 @@ class TetrisApp:
             self.game_view.draw(self.game, self.camera)       
 
 if __name__ == "__main__":
-    TetrisApp()
\ No newline at end of file
+    # python main.py --replay FILE [--speed N] でリプレイを再生
+    parser = argparse.ArgumentParser(description="HITORIS")
+    parser.add_argument("--replay", help="再生するリプレイファイル")
+    parser.add_argument("--speed", type=float, default=1.0, help="リプレイの再生速度（倍）")
+    args = parser.parse_args()
+    TetrisApp(args.replay, args.speed)
\ No newline at end of file
@@ -4,8 +4,9 @@ sys.path.append("/usr/lib/python3/dist-packages")
 import pyxel
 from config import Config
 from picamera2 import Picamera2
-from PIL import Image
 import numpy as np
+import hashlib
+import os
 import threading
 import random
 import time
@@ -68,9 +69,18 @@ class AICamera:
         self.color_lut = self._build_weighted_lut_6bit()
 
         # 状態変数
-        self.shared_frame = None
         self.lock = threading.Lock()
 
+        # パレット番号にした映像の3面バッファ（カメラのスレッドが書き、描画は最新の面を読むだけ）
+        # 最新の面と描画が読んでいる面には書かないので、描画が遅れても読んでいる映像は壊れない
+        view_shape = (Config.CAMERA_VIEW_HEIGHT, Config.CAMERA_VIEW_WIDTH)
+        self.frame_slots = [np.zeros(view_shape, dtype=np.uint8) for _ in range(3)]
+        self.frame_seq = 0  # 書き終えた映像の通し番号（0はまだ映像がない）
+        self.frame_slot = 0  # 最新の映像がある面
+        self.frame_reading = 0  # 最後に get_frame() で渡した面
+        self._flat_lut = self.color_lut.reshape(-1)
+        self._sample_key = None  # 縮小の準備をしたカメラ画像のサイズ
+
         # 最後に検出された結果を保存する変数
         self.last_boxes = None
         self.last_scores = None
@@ -171,58 +181,148 @@ class AICamera:
             palette.append([r, g, b])
         return np.array(palette, dtype=np.int16)
     
-    # R成分に重みをつけた LUT を構築
+    # R成分に重みをつけた LUT を構築（パレットと重みが同じなら保存済みのものを mmap で読む）
     def _build_weighted_lut_6bit(self, rgb_weights=(1.4, 1.0, 0.6)):
-        lut = np.zeros((64, 64, 64), dtype=np.uint8)
-        w = np.array(rgb_weights).reshape(1, 1, 3)
-
-        for r in range(64):
-            for g in range(64):
-                for b in range(64):
-                    rgb = np.array([r << 2, g << 2, b << 2])
-                    diffs = self.pyxel_palette.astype(np.int16) - rgb.astype(np.int16)
-                    distances = np.sum((diffs * w) ** 2, axis=2)
-                    lut[r, g, b] = np.argmin(distances)
+        path = self._lut_cache_path(rgb_weights)
+        if path is not None and os.path.exists(path):
+            try:
+                lut = np.load(path, mmap_mode="r")
+                if lut.shape == (64, 64, 64) and lut.dtype == np.uint8:
+                    return lut
+            except (OSError, ValueError):
+                pass  # 壊れていたら作り直す
+
+        lut = AICamera._compute_weighted_lut_6bit(self.pyxel_palette.reshape(16, 3), rgb_weights)
+        if path is not None:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = path + ".tmp.npy"
+                np.save(tmp_path, lut)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"Warning: Could not save color LUT: {e}")
+        return lut
+
+    def _lut_cache_path(self, rgb_weights):
+        """パレットと重みから LUT の保存先を決める（保存しない設定ならNone）"""
+        if not Config.CAMERA_LUT_CACHE_DIR:
+            return None
+        key = hashlib.sha1(self.pyxel_palette.astype(np.int16).tobytes())
+        key.update(repr(tuple(float(w) for w in rgb_weights)).encode("ascii"))
+        return os.path.join(Config.CAMERA_LUT_CACHE_DIR, f"color_lut_{key.hexdigest()[:16]}.npy")
+
+    @staticmethod
+    def _compute_weighted_lut_6bit(palette, rgb_weights, chunk=8):
+        """6bitのRGBそれぞれについて、重みつき距離が最も近いパレット番号を求める
+
+        距離はチャンネルごとの項の和なので、チャンネルごとの (64, 16) の表を足し合わせて求める。
+        メモリを抑えるため、Rを chunk 段ずつ処理する。
+        """
+        levels = np.arange(64, dtype=np.int16) << 2
+        weights = np.asarray(rgb_weights, dtype=np.float64)
+        # terms[c][v, k] = (重み * (パレットkの値 - v)) ** 2
+        terms = [((palette[:, c].astype(np.int16)[None, :] - levels[:, None]) * weights[c]) ** 2
+                 for c in range(3)]
+
+        lut = np.empty((64, 64, 64), dtype=np.uint8)
+        for r in range(0, 64, chunk):
+            # 元のループ（R, G, B の順に足す）と同じ丸めになるよう、同じ順で足す
+            rg = terms[0][r:r + chunk, None, :] + terms[1][None, :, :]
+            distances = rg[:, :, None, :] + terms[2][None, None, :, :]
+            lut[r:r + chunk] = np.argmin(distances, axis=3)
         return lut
     
     # カメラ画像取得 → リサイズ
     def _camera_callback(self, request):
-        if self.mode == "pose":
-            boxes, scores, keypoints = self._ai_output_tensor_parse_pose(request.get_metadata())
-            with MappedArray(request, stream='main') as m:
+        # カメラのバッファをコピーせずに参照する（with の中でだけ有効）
+        with MappedArray(request, stream='main') as m:
+            image = m.array
+            img_height, img_width = image.shape[:2]
+
+            if self.mode == "pose":
+                boxes, scores, keypoints = self._ai_output_tensor_parse_pose(request.get_metadata())
                 # キーポイントからブロックを生成して描画
                 if keypoints is not None and len(keypoints) > 0:
-                    img_height, img_width = m.array.shape[:2]
                     self.shared_tetromino = self._create_occupancy_grid(keypoints, img_width, img_height)
                 else:
                     self.shared_tetromino = None
-        else:
-            # 物体検出の場合
-            detected_objects = self._ai_output_tensor_parse_objects(request.get_metadata())
-            if detected_objects is not None and len(detected_objects) > 0:
-                self.last_detected_time = time.time()
-                with MappedArray(request, stream='main') as m:
-                    img_height, img_width = m.array.shape[:2]
-                    self.shared_tetromino = self._create_tetromino_from_objects(detected_objects, img_width, img_height)
             else:
-                if time.time() - self.last_detected_time > AICamera.BLOCK_TIMEOUT:
-                    self.shared_tetromino = None
-        
-        if self.shared_tetromino is None:
-            self.shared_labels = None
-            self.shared_boxes = None  
-
-        # pyxel画像化
-        frame = request.make_array("main")
-        h, w, _ = frame.shape
-        min_side = min(h, w)
-        top = (h - min_side) // 2
-        left = (w - min_side) // 2
-        cropped = frame[top:top + min_side, left:left + min_side]
-        resized = np.array(Image.fromarray(cropped).resize((Config.CAMERA_VIEW_WIDTH, Config.CAMERA_VIEW_HEIGHT), Image.BILINEAR))
+                # 物体検出の場合
+                detected_objects = self._ai_output_tensor_parse_objects(request.get_metadata())
+                if detected_objects is not None and len(detected_objects) > 0:
+                    self.last_detected_time = time.time()
+                    self.shared_tetromino = self._create_tetromino_from_objects(detected_objects, img_width, img_height)
+                else:
+                    if time.time() - self.last_detected_time > AICamera.BLOCK_TIMEOUT:
+                        self.shared_tetromino = None
+
+            if self.shared_tetromino is None:
+                self.shared_labels = None
+                self.shared_boxes = None
+
+            # pyxel画像化
+            self._publish_frame(self._downsample(image))
+
+    def _downsample(self, image):
+        """中央の正方形を表示サイズに縮小する（近い2x2画素の平均。元の画像はコピーしない）
+
+        行 -> 列の順に必要な画素だけを np.take で集めて足すので、作業用の配列は表示サイズ程度で済む。
+        """
+        height, width = image.shape[:2]
+        side = min(height, width)
+        if self._sample_key != (height, width):
+            self._prepare_downsample(side)
+            self._sample_key = (height, width)
+
+        top = (height - side) // 2
+        left = (width - side) // 2
+        cropped = image[top:top + side, left:left + side, :3]  # ビュー（コピーしない）
+
+        rows = self._sample_rows_sum
+        np.take(cropped, self._sample_rows[0], axis=0, out=self._sample_rows_tmp)
+        rows[...] = self._sample_rows_tmp
+        np.take(cropped, self._sample_rows[1], axis=0, out=self._sample_rows_tmp)
+        np.add(rows, self._sample_rows_tmp, out=rows)
+
+        total = self._sample_total
+        np.take(rows, self._sample_cols[0], axis=1, out=total)
+        np.take(rows, self._sample_cols[1], axis=1, out=self._sample_cols_tmp)
+        np.add(total, self._sample_cols_tmp, out=total)
+        np.right_shift(total, 2, out=total)
+        return total
+
+    def _prepare_downsample(self, side):
+        """side 画素四方を表示サイズに縮小するための位置と作業用の配列を用意する"""
+        view_height, view_width = Config.CAMERA_VIEW_HEIGHT, Config.CAMERA_VIEW_WIDTH
+        self._sample_rows = AICamera._sample_axis(side, view_height)
+        self._sample_cols = AICamera._sample_axis(side, view_width)
+        self._sample_rows_tmp = np.empty((view_height, side, 3), dtype=np.uint8)
+        self._sample_rows_sum = np.empty((view_height, side, 3), dtype=np.uint16)
+        self._sample_cols_tmp = np.empty((view_height, view_width, 3), dtype=np.uint16)
+        self._sample_total = np.empty((view_height, view_width, 3), dtype=np.uint16)
+
+    @staticmethod
+    def _sample_axis(side, size):
+        """side 画素を size 画素に縮小する時、出力の各画素の中心をはさむ2つの入力画素の位置"""
+        centers = (np.arange(size) + 0.5) * side / size - 0.5
+        low = np.clip(np.floor(centers).astype(np.intp), 0, side - 1)
+        high = np.minimum(low + 1, side - 1)
+        return low, high
+
+    def _publish_frame(self, rgb):
+        """RGB画像をパレット番号にして、最新の面でも描画が読んでいる面でもない面に書き込んでから公開する
+
+        描画側が読む面は次に get_frame() を呼ぶまで書き換えないので、読むのに時間がかかっても映像が混ざらない。
+        """
+        with self.lock:
+            slot = next(i for i in range(3) if i != self.frame_slot and i != self.frame_reading)
+        reduced = rgb >> 2
+        index = (reduced[:, :, 0].astype(np.intp) << 12) | (reduced[:, :, 1].astype(np.intp) << 6) | reduced[:, :, 2]
+        np.take(self._flat_lut, index, out=self.frame_slots[slot])
 
         with self.lock:
-            self.shared_frame = resized
+            self.frame_slot = slot
+            self.frame_seq += 1
 
     def _ai_output_tensor_parse_pose(self, metadata: dict):
         """ポーズ推定用のパース処理"""
@@ -548,9 +648,17 @@ class AICamera:
 
     # Pyxel描画
     def get_frame(self):
+        """最新の映像を (通し番号, パレット番号の画像) で返す
+
+        コピーしないので書き換えないこと。返した面は、次に get_frame() を呼ぶまでカメラのスレッドが書き換えない。
+        """
         with self.lock:
-            frame = self.shared_frame.copy() if self.shared_frame is not None else None
-        return frame
+            seq = self.frame_seq
+            slot = self.frame_slot
+            self.frame_reading = slot
+        if seq == 0:
+            return 0, None
+        return seq, self.frame_slots[slot]
     def get_labels(self):
         return self.shared_labels
     
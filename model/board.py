@@ -1,85 +1,356 @@
-import pyxel
-from view.game_view import GameView
-        
+import random
+
+
 class Board:
+    """ゲームボード
+
+    衝突判定・行判定は各行を int のビットマスクで表した `rows` で行う（ビット x が列 x）。
+    `grid` は描画用のビューとして、セルごとのテトロミノ種別を同時に保持する。
+    列の高さ・列ごとのブロック数・穴の数・行ごとのブロック数は、固定時と行消去時に差分で更新する。
+    `zobrist` は埋まったセルの乱数キーのXORで、同じ盤面なら同じ値になる（AIの計画キャッシュ用）。
+    """
+    ZOBRIST_SEED = 0x5A0B  # プロセスが変わっても同じハッシュになるよう固定
+
+    _zobrist_tables = {}  # (幅, 高さ) -> セルごとの乱数キー
+
     def __init__(self, width, height):
         self.width = width
         self.height = height
-        self.grid = [[0 for _ in range(width)] for _ in range(height)]
-    
+        self.full_mask = (1 << width) - 1  # 1行がすべて埋まった状態のマスク
+        self.version = 0  # 盤面が変わるたびに増えるバージョン番号
+        self.zobrist_keys = Board._get_zobrist_keys(width, height)
+        self.clear()
+
+    @staticmethod
+    def _get_zobrist_keys(width, height):
+        """セル (x, y) ごとの64bitの乱数キー表 keys[y][x] を取得（同じサイズの盤面で共有）"""
+        keys = Board._zobrist_tables.get((width, height))
+        if keys is None:
+            rng = random.Random(Board.ZOBRIST_SEED)
+            keys = tuple(tuple(rng.getrandbits(64) for _ in range(width)) for _ in range(height))
+            Board._zobrist_tables[(width, height)] = keys
+        return keys
+
     def clear(self):
         """ボードをクリアする"""
+        self._touch()
         self.grid = [[0 for _ in range(self.width)] for _ in range(self.height)]
-    
+        self.rows = [0] * self.height
+        self.zobrist = 0
+
+        # 盤面特徴量（差分更新）
+        self.heights = [0] * self.width      # 列の高さ（最上段のブロックから床まで）
+        self.col_counts = [0] * self.width   # 列ごとのブロック数
+        self.holes = [0] * self.width        # 列ごとの穴の数（最上段より下の空白）
+        self.row_counts = [0] * self.height  # 行ごとのブロック数
+
+    def copy(self, with_grid=True):
+        """盤面を複製する（with_grid=False なら grid を持たない探索用の軽量コピー）"""
+        board = Board.__new__(Board)
+        board.width = self.width
+        board.height = self.height
+        board.full_mask = self.full_mask
+        board.version = 0
+        board.zobrist_keys = self.zobrist_keys
+        board.zobrist = self.zobrist
+        board._landing_cache = {}
+        board.grid = [row[:] for row in self.grid] if with_grid and self.grid is not None else None
+        board.rows = self.rows[:]
+        board.heights = self.heights[:]
+        board.col_counts = self.col_counts[:]
+        board.holes = self.holes[:]
+        board.row_counts = self.row_counts[:]
+        return board
+
+    def load_grid(self, grid):
+        """grid（セルごとのテトロミノ種別）から盤面を復元する"""
+        self.clear()
+        for y, row in enumerate(grid):
+            self.grid[y] = list(row)
+            for x, cell in enumerate(row):
+                if cell != 0:
+                    self.rows[y] |= 1 << x
+                    self.row_counts[y] += 1
+                    self.col_counts[x] += 1
+                    if self.height - y > self.heights[x]:
+                        self.heights[x] = self.height - y
+
+        for x in range(self.width):
+            self.holes[x] = self.heights[x] - self.col_counts[x]
+
+        self.zobrist = 0
+        for y, row in enumerate(self.rows):
+            self.zobrist ^= self._row_zobrist(y, row)
+
+    def _row_zobrist(self, y, row):
+        """y行目がビットマスク row の時の、その行のセルのキーのXOR"""
+        keys = self.zobrist_keys[y]
+        value = 0
+        while row:
+            low = row & -row
+            value ^= keys[low.bit_length() - 1]
+            row ^= low
+        return value
+
     def is_valid_position(self, tetromino):
         """テトロミノの位置が有効かどうかをチェック"""
-        shape = tetromino.get_shape()
-        
-        for y in range(len(shape)):
-            for x in range(len(shape[y])):
-                if shape[y][x] == 0:
-                    continue  # 空のセルはスキップ
-                
-                # テトロミノのグリッド上の位置
-                board_x = tetromino.x + x
-                board_y = tetromino.y + y
-                
-                # ボードの外側にはみ出していないかチェック
-                if (board_x < 0 or board_x >= self.width or
-                    board_y < 0 or board_y >= self.height):
-                    return False
-                
-                # 他のブロックと重なっていないかチェック
-                if board_y >= 0 and self.grid[board_y][board_x] != 0:
-                    return False
-        
+        row_masks, min_x, max_x = tetromino.get_bitmask()
+        x = tetromino.x
+        y = tetromino.y
+
+        # ボードの左右にはみ出していないかチェック
+        if x + min_x < 0 or x + max_x >= self.width:
+            return False
+
+        rows = self.rows
+        for dy, mask in row_masks:
+            board_y = y + dy
+
+            # ボードの上下にはみ出していないかチェック
+            if board_y < 0 or board_y >= self.height:
+                return False
+
+            # 他のブロックと重なっていないかチェック
+            if rows[board_y] & (mask << x if x >= 0 else mask >> -x):
+                return False
+
         return True
-    
+
     def lock_tetromino(self, tetromino):
         """テトロミノをボードに固定する"""
-        shape = tetromino.get_shape()
+        x = tetromino.x
+        y = tetromino.y
         # tetromino.type + 1 をセルに格納（0は空白を表すため）
         tetromino_type = tetromino.type + 1
-        
-        for y in range(len(shape)):
-            for x in range(len(shape[y])):
-                if shape[y][x] == 0:
-                    continue  # 空のセルはスキップ
-                
-                board_x = tetromino.x + x
-                board_y = tetromino.y + y
-                
-                if 0 <= board_y < self.height and 0 <= board_x < self.width:
-                    self.grid[board_y][board_x] = tetromino_type
-        
+        grid = self.grid
+        self._touch()
+
+        for dx, dy in tetromino.get_cells():
+            board_x = x + dx
+            board_y = y + dy
+
+            if 0 <= board_y < self.height and 0 <= board_x < self.width:
+                if grid is not None:
+                    grid[board_y][board_x] = tetromino_type
+                if self.rows[board_y] >> board_x & 1:
+                    continue  # すでに埋まっているセル
+                self.rows[board_y] |= 1 << board_x
+                self.zobrist ^= self.zobrist_keys[board_y][board_x]
+
+                # 盤面特徴量を更新
+                self.row_counts[board_y] += 1
+                self.col_counts[board_x] += 1
+                if self.height - board_y > self.heights[board_x]:
+                    self.heights[board_x] = self.height - board_y
+                self.holes[board_x] = self.heights[board_x] - self.col_counts[board_x]
+
     def is_line_full(self, y):
         """指定した行が埋まっているかチェック"""
-        return all(self.grid[y][x] != 0 for x in range(self.width))
-    
+        return self.rows[y] == self.full_mask
+
     def clear_line(self, y):
         """指定した行を消去し、上の行を下に移動"""
+        removed = self.rows[y]
+        self._touch()
+
+        # 列の高さを更新（最上段が消える列だけ下を探し直す）
+        for x in range(self.width):
+            top = self.height - self.heights[x]
+            if self.heights[x] == 0 or top > y:
+                continue  # 消去行より上にブロックがない列は変化なし
+            if removed >> x & 1:
+                self.col_counts[x] -= 1
+            if top < y:
+                self.heights[x] -= 1
+            else:
+                self.heights[x] = self._scan_height(x, y + 1)
+            self.holes[x] = self.heights[x] - self.col_counts[x]
+
         for row in range(y, 0, -1):
-            self.grid[row] = self.grid[row - 1][:]
-        
+            if self.grid is not None:
+                self.grid[row] = self.grid[row - 1][:]
+            if self.rows[row] != self.rows[row - 1]:
+                self.zobrist ^= self._row_zobrist(row, self.rows[row]) ^ self._row_zobrist(row, self.rows[row - 1])
+            self.rows[row] = self.rows[row - 1]
+            self.row_counts[row] = self.row_counts[row - 1]
+
         # 最上段を空にする
-        self.grid[0] = [0 for _ in range(self.width)]
-    
+        if self.grid is not None:
+            self.grid[0] = [0 for _ in range(self.width)]
+        self.zobrist ^= self._row_zobrist(0, self.rows[0])
+        self.rows[0] = 0
+        self.row_counts[0] = 0
+
     def clear_lines(self):
-        """埋まった行を消去し、消去した行数を返す"""
-        lines_cleared = 0
+        """埋まった行を消去し、消去した行のインデックス一覧（下から順）を返す
+
+        残す行を下から詰めていく1回の走査で、ビットマスク・grid・行ごとのブロック数をまとめて移動する。
+        """
+        rows = self.rows
+        full_mask = self.full_mask
+        if full_mask not in rows:
+            return []
+
+        grid = self.grid
+        row_counts = self.row_counts
         cleared_lines = []
-        
+        self._touch()
+
+        # 下から順に、埋まっていない行を書き込み位置へ詰める
+        write_y = self.height - 1
         for y in range(self.height - 1, -1, -1):
-            if self.is_line_full(y):
+            if rows[y] == full_mask:
                 cleared_lines.append(y)
-                lines_cleared += 1
-        
-        # エフェクトのためにゲームビューに通知
-        if hasattr(pyxel, 'APP') and hasattr(pyxel.APP, 'game_view'):
-            pyxel.APP.game_view.add_line_clear_effect(cleared_lines)
-            
-        # 実際に行を消去
-        for y in sorted(cleared_lines):
-            self.clear_line(y)
-            
-        return lines_cleared
+                continue
+            if write_y != y:
+                if rows[write_y] != rows[y]:
+                    # 行が移動した位置のハッシュを差し替える
+                    self.zobrist ^= self._row_zobrist(write_y, rows[write_y]) ^ self._row_zobrist(write_y, rows[y])
+                rows[write_y] = rows[y]
+                if grid is not None:
+                    grid[write_y] = grid[y]
+                row_counts[write_y] = row_counts[y]
+            write_y -= 1
+
+        # 空いた上段を空にする
+        for y in range(write_y, -1, -1):
+            if rows[y]:
+                self.zobrist ^= self._row_zobrist(y, rows[y])
+            rows[y] = 0
+            if grid is not None:
+                grid[y] = [0] * self.width
+            row_counts[y] = 0
+
+        # 列の特徴量を更新（消えた行はすべての列で埋まっていた）
+        lines_cleared = len(cleared_lines)
+        cleared = set(cleared_lines)
+        for x in range(self.width):
+            self.col_counts[x] -= lines_cleared
+            if self.height - self.heights[x] in cleared:
+                # 最上段が消えた列は下を探し直す
+                self.heights[x] = self._scan_height(x, write_y + 1)
+            else:
+                self.heights[x] -= lines_cleared
+            self.holes[x] = self.heights[x] - self.col_counts[x]
+
+        return cleared_lines
+
+    def _touch(self):
+        """盤面が変わったのでバージョンを進め、着地位置のキャッシュを破棄する"""
+        self.version += 1
+        self._landing_cache = {}
+
+    def get_landing_y(self, tetromino):
+        """テトロミノを現在位置からまっすぐ落とした時の着地位置（y座標）を返す
+
+        結果は (形状, 回転, x, y) ごとに、盤面が変わるまでキャッシュする。
+        """
+        key = (tetromino.shape, tetromino.rotation, tetromino.x, tetromino.y)
+        landing_y = self._landing_cache.get(key)
+        if landing_y is None:
+            landing_y = self._compute_landing_y(tetromino)
+            self._landing_cache[key] = landing_y
+        return landing_y
+
+    def _compute_landing_y(self, tetromino):
+        """列の高さとテトロミノの下端プロファイルから着地位置を求める"""
+        x = tetromino.x
+        y = tetromino.y
+        landing_y = None
+
+        for dx, dy in tetromino.get_bottom_profile():
+            board_x = x + dx
+            if not 0 <= board_x < self.width:
+                return y  # ボード外（呼び出し側で有効な位置を渡す前提）
+
+            top = self.height - self.heights[board_x]  # 列の最上段のブロック（空なら床）
+            if y + dy >= top:
+                # 張り出しの下にいるので、表面の高さは使えない
+                return self._drop_step_by_step(tetromino)
+
+            candidate = top - 1 - dy
+            if landing_y is None or candidate < landing_y:
+                landing_y = candidate
+
+        return y if landing_y is None else landing_y
+
+    def _drop_step_by_step(self, tetromino):
+        """1段ずつ下げて着地位置を求める（張り出しの下にいる場合）"""
+        original_y = tetromino.y
+        try:
+            while True:
+                tetromino.y += 1
+                if not self.is_valid_position(tetromino):
+                    return tetromino.y - 1
+        finally:
+            tetromino.y = original_y
+
+    def _scan_height(self, x, start_y):
+        """start_y 以下で列 x の最上段のブロックを探し、列の高さを返す"""
+        bit = 1 << x
+        for y in range(start_y, self.height):
+            if self.rows[y] & bit:
+                return self.height - y
+        return 0
+
+    def get_wells(self):
+        """列ごとの井戸の深さ（両隣の低い方との高さの差）を取得"""
+        wells = []
+        for x in range(self.width):
+            left = self.heights[x - 1] if x > 0 else self.height
+            right = self.heights[x + 1] if x < self.width - 1 else self.height
+            wells.append(max(min(left, right) - self.heights[x], 0))
+        return wells
+
+    def evaluate_placement(self, tetromino):
+        """テトロミノを現在位置に固定した場合の盤面特徴量を返す（盤面は変更しない）
+
+        gridを複製せず、差分更新している特徴量にピースの分だけを加えて O(幅) で計算する。
+        特徴量はライン消去前の盤面に対するもので、lines は消去可能になる行数。
+        """
+        x = tetromino.x
+        y = tetromino.y
+
+        heights = self.heights[:]
+        holes = self.holes[:]
+        piece_rows = {}
+        piece_cols = {}
+
+        for dx, dy in tetromino.get_cells():
+            board_x = x + dx
+            board_y = y + dy
+            if not (0 <= board_y < self.height and 0 <= board_x < self.width):
+                continue
+            if self.rows[board_y] >> board_x & 1:
+                continue
+
+            piece_rows[board_y] = piece_rows.get(board_y, 0) + 1
+            piece_cols[board_x] = piece_cols.get(board_x, 0) + 1
+            if self.height - board_y > heights[board_x]:
+                heights[board_x] = self.height - board_y
+
+        # ピースが置かれた列だけ穴の数を更新
+        for board_x, count in piece_cols.items():
+            holes[board_x] = heights[board_x] - (self.col_counts[board_x] + count)
+
+        # 埋まる行の数
+        lines = 0
+        for board_y, count in piece_rows.items():
+            if self.row_counts[board_y] + count == self.width:
+                lines += 1
+
+        agg_height = sum(heights)
+        total_holes = sum(holes)
+        bumpiness = sum(abs(heights[i] - heights[i + 1]) for i in range(self.width - 1))
+
+        return {
+            "lines": lines,
+            "heights": heights,
+            "agg_height": agg_height,
+            "holes": total_holes,
+            "bumpiness": bumpiness,
+            "max_height": max(heights) if heights else 0,
+            # 現在の盤面からの差分
+            "delta_agg_height": agg_height - sum(self.heights),
+            "delta_holes": total_holes - sum(self.holes),
+        }
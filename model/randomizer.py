@@ -0,0 +1,64 @@
+import random
+
+
+class PieceGenerator:
+    """テトロミノの種類を生成するジェネレーター
+
+    シードを指定すれば同じ順番を再現できる（AIのベンチマークやリプレイ用）。
+    乱数はPythonのバージョンに依存しないよう splitmix64 で生成し、状態は整数1つで表せる。
+
+    mode: "bag"（7種類を1セットずつシャッフルして出す）または "uniform"（毎回7種類から一様に選ぶ）
+    """
+    MODES = ("bag", "uniform")
+    TYPE_COUNT = 7
+
+    _MASK64 = (1 << 64) - 1
+
+    def __init__(self, seed=None, mode="uniform"):
+        if mode not in PieceGenerator.MODES:
+            raise ValueError(f"Unknown randomizer mode: {mode}")
+        self.mode = mode
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """シードを設定して最初からやり直す（省略時はランダムなシード）"""
+        if seed is None:
+            seed = random.getrandbits(32)
+        self.seed = seed
+        self.state = seed & PieceGenerator._MASK64
+        self.bag = []
+
+    def _next_random(self):
+        """splitmix64 で次の64bit乱数を生成"""
+        self.state = (self.state + 0x9E3779B97F4A7C15) & PieceGenerator._MASK64
+        z = self.state
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & PieceGenerator._MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & PieceGenerator._MASK64
+        return z ^ (z >> 31)
+
+    def _randbelow(self, n):
+        """0以上n未満の乱数"""
+        return self._next_random() % n
+
+    def next_type(self):
+        """次のテトロミノの種類 (0-6) を取得"""
+        if self.mode == "uniform":
+            return self._randbelow(PieceGenerator.TYPE_COUNT)
+
+        # 7種類を使い切ったら新しいセットをシャッフル（Fisher-Yates）
+        if not self.bag:
+            bag = list(range(PieceGenerator.TYPE_COUNT))
+            for i in range(len(bag) - 1, 0, -1):
+                j = self._randbelow(i + 1)
+                bag[i], bag[j] = bag[j], bag[i]
+            self.bag = bag
+        return self.bag.pop()
+
+    def get_state(self):
+        """現在の状態を (乱数の状態, 残りのセット) で取得"""
+        return self.state, tuple(self.bag)
+
+    def set_state(self, state):
+        """get_state() で取得した状態に戻す"""
+        self.state, bag = state
+        self.bag = list(bag)
@@ -0,0 +1,339 @@
+import json
+import os
+import struct
+import time
+import zlib
+from config import Config
+
+# 1フレーム分の入力ビット（再生時はこの順番で適用する。GameControllerの処理順と同じ）
+INPUT_HOLD = 1 << 0
+INPUT_LEFT = 1 << 1
+INPUT_RIGHT = 1 << 2
+INPUT_SOFT = 1 << 3
+INPUT_HARD = 1 << 4
+INPUT_ROT_CCW = 1 << 5
+INPUT_ROT_CW = 1 << 6
+
+# ヘッダーのフラグ
+FLAG_AUTO_PLAY = 1 << 0
+FLAG_CAMERA = 1 << 1
+
+
+class Replay:
+    """1ゲーム分のリプレイデータ
+
+    シードと、フレームごとの入力ビットをランレングス圧縮した列、
+    シーク用に一定間隔で保存した状態（キーフレーム）を持つ。
+    """
+    MAGIC = b"HTRP"
+    VERSION = 1
+    MODES = ("uniform", "bag")
+
+    # マジック, バージョン, フラグ, 生成モード, ネクスト数, シード, 開始フレーム, フレーム数, スコア, ライン数
+    HEADER = struct.Struct("<4sBBBBQIIQI")
+
+    def __init__(self, seed=0, mode="uniform", preview_depth=2, is_auto_play=False):
+        self.seed = seed
+        self.mode = mode
+        self.preview_depth = preview_depth
+        self.is_auto_play = is_auto_play
+        self.camera_used = False  # カメラのテトロミノを使った（再現できない）
+        self.start_frame = 0  # 最初の update() 時のフレーム番号
+        self.frame_count = 0
+        self.runs = []  # [入力ビット, 連続フレーム数] の一覧
+        self.keyframes = []  # (フレーム位置, GameEngine.snapshot()) の一覧
+        self.score = 0
+        self.lines = 0
+
+    def append(self, mask):
+        """1フレーム分の入力を追加"""
+        if self.runs and self.runs[-1][0] == mask:
+            self.runs[-1][1] += 1
+        else:
+            self.runs.append([mask, 1])
+        self.frame_count += 1
+
+    def iter_inputs(self, start=0):
+        """start フレーム目以降の入力ビットを順に返す"""
+        position = 0
+        for mask, count in self.runs:
+            if position + count <= start:
+                position += count
+                continue
+            for _ in range(count - max(start - position, 0)):
+                yield mask
+            position += count
+
+    def to_bytes(self):
+        """バイナリ形式に変換"""
+        flags = 0
+        if self.is_auto_play:
+            flags |= FLAG_AUTO_PLAY
+        if self.camera_used:
+            flags |= FLAG_CAMERA
+
+        header = Replay.HEADER.pack(
+            Replay.MAGIC, Replay.VERSION, flags,
+            Replay.MODES.index(self.mode), self.preview_depth,
+            self.seed & 0xFFFFFFFFFFFFFFFF, self.start_frame, self.frame_count,
+            self.score, self.lines)
+
+        # 入力列: (入力ビット 1byte, フレーム数 varint) の繰り返し
+        runs = bytearray()
+        for mask, count in self.runs:
+            runs.append(mask)
+            while count >= 0x80:
+                runs.append((count & 0x7F) | 0x80)
+                count >>= 7
+            runs.append(count)
+
+        keyframes = json.dumps(self.keyframes, separators=(",", ":")).encode("utf-8")
+
+        body = bytearray()
+        for block in (runs, keyframes):
+            compressed = zlib.compress(bytes(block), 9)
+            body += struct.pack("<I", len(compressed)) + compressed
+        return header + bytes(body)
+
+    @staticmethod
+    def from_bytes(data):
+        """バイナリ形式から復元"""
+        (magic, version, flags, mode, preview_depth, seed,
+         start_frame, frame_count, score, lines) = Replay.HEADER.unpack_from(data, 0)
+        if magic != Replay.MAGIC or version != Replay.VERSION:
+            raise ValueError("Not a HITORIS replay file")
+
+        blocks = []
+        offset = Replay.HEADER.size
+        for _ in range(2):
+            (size,) = struct.unpack_from("<I", data, offset)
+            offset += 4
+            blocks.append(zlib.decompress(data[offset:offset + size]))
+            offset += size
+        runs_data, keyframes_data = blocks
+
+        replay = Replay(seed, Replay.MODES[mode], preview_depth, bool(flags & FLAG_AUTO_PLAY))
+        replay.camera_used = bool(flags & FLAG_CAMERA)
+        replay.start_frame = start_frame
+        replay.score = score
+        replay.lines = lines
+
+        i = 0
+        while i < len(runs_data):
+            mask = runs_data[i]
+            i += 1
+            count = 0
+            shift = 0
+            while True:
+                byte = runs_data[i]
+                i += 1
+                count |= (byte & 0x7F) << shift
+                shift += 7
+                if byte < 0x80:
+                    break
+            replay.runs.append([mask, count])
+        replay.frame_count = sum(count for _, count in replay.runs)
+        if replay.frame_count != frame_count:
+            raise ValueError("Broken replay file")
+
+        replay.keyframes = [(index, state) for index, state in json.loads(keyframes_data)]
+        return replay
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            return Replay.from_bytes(f.read())
+
+
+class ReplayRecorder:
+    """GameEngine の操作を記録してリプレイを作成する
+
+    GameEngine.set_recorder() で登録すると、start() から reset() までの1ゲームを記録し、
+    directory が指定されていればファイルに保存する。
+    - オートプレイのゲームは auto_play が True の時だけ保存する
+    - directory のリプレイは新しいものから keep 個だけ残す（0なら消さない）
+    """
+    def __init__(self, directory=None, keyframe_interval=Config.REPLAY_KEYFRAME_INTERVAL,
+                 auto_play=Config.REPLAY_AUTO_PLAY, keep=Config.REPLAY_KEEP):
+        self.directory = directory
+        self.keyframe_interval = keyframe_interval
+        self.auto_play = auto_play
+        self.keep = keep
+        self.replay = None
+        self.mask = 0
+        self.last_path = None  # 最後に保存したファイル
+
+    def begin(self, engine):
+        """記録を開始する（GameEngine.start() から呼ばれる）"""
+        self.replay = Replay(engine.seed, engine.generator.mode,
+                             engine.preview_depth, engine.is_auto_play)
+        self.replay.keyframes.append((0, engine.snapshot()))
+        self.mask = 0
+
+    def press(self, bit):
+        """現在のフレームの入力を記録"""
+        if self.replay is not None:
+            self.mask |= bit
+
+    def mark_camera(self):
+        """カメラのテトロミノが使われたことを記録"""
+        if self.replay is not None:
+            self.replay.camera_used = True
+
+    def end_frame(self, frame):
+        """フレームの入力を確定する（GameEngine.update() の先頭で呼ばれる）"""
+        if self.replay is None:
+            return
+        if self.replay.frame_count == 0:
+            self.replay.start_frame = frame
+        self.replay.append(self.mask)
+        self.mask = 0
+
+    def keyframe(self, engine):
+        """一定間隔で状態を保存する（GameEngine.update() の最後で呼ばれる）"""
+        if self.replay is None:
+            return
+        if self.replay.frame_count % self.keyframe_interval == 0:
+            self.replay.keyframes.append((self.replay.frame_count, engine.snapshot()))
+
+    def finish(self, engine):
+        """記録を終了してリプレイを返す（GameEngine.reset() から呼ばれる）"""
+        replay = self.replay
+        if replay is None:
+            return None
+        self.replay = None
+
+        replay.score = engine.score
+        replay.lines = engine.lines_cleared
+
+        if self.directory and replay.frame_count > 0 and (self.auto_play or not replay.is_auto_play):
+            os.makedirs(self.directory, exist_ok=True)
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{replay.seed & 0xFFFFFFFF:08x}.htr"
+            self.last_path = os.path.join(self.directory, name)
+            replay.save(self.last_path)
+            self._remove_old()
+        return replay
+
+    def _remove_old(self):
+        """保存先のリプレイを新しいものから keep 個だけ残す（ファイル名が日時で始まるので名前順に古い）"""
+        if self.keep <= 0:
+            return
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(".htr"))
+        for name in names[:-self.keep]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass  # 他で消された・使用中なら次の保存時に消す
+
+
+class ReplayPlayer:
+    """リプレイを再生する
+
+    ヘッドレスでは run() で最高速に再シミュレーションし、
+    描画する場合は毎フレーム advance(speed) で任意の倍速で進める。
+    """
+    def __init__(self, replay, engine=None):
+        if replay.camera_used:
+            raise ValueError("Replays with camera tetrominos cannot be played back")
+
+        if engine is None:
+            from model.engine import GameEngine
+            engine = GameEngine()
+
+        self.replay = replay
+        self.engine = engine
+        self.engine.generator.mode = replay.mode
+        self.engine.preview_depth = replay.preview_depth
+
+        self.frame = 0  # 次に再生するフレーム位置
+        self._inputs = None
+        self._speed_remainder = 0.0
+        self.restart()
+
+    def restart(self):
+        """最初から再生し直す"""
+        self.engine.reset()
+        self.engine.start(self.replay.is_auto_play, self.replay.seed)
+        self.engine.frame_count = self.replay.start_frame
+        self.frame = 0
+        self._inputs = self.replay.iter_inputs(0)
+
+    def is_finished(self):
+        return self.frame >= self.replay.frame_count
+
+    def step(self, frames=1):
+        """指定フレーム数だけ進める（最後まで再生したらFalse）"""
+        for _ in range(frames):
+            if self.is_finished():
+                return False
+            self._apply(next(self._inputs))
+            self.engine.update()
+            self.frame += 1
+        return not self.is_finished()
+
+    def advance(self, speed=1.0):
+        """描画の1フレーム分進める（speed倍速、1未満ならスロー再生）"""
+        self._speed_remainder += speed
+        frames = int(self._speed_remainder)
+        self._speed_remainder -= frames
+        return self.step(frames)
+
+    def run(self):
+        """最後まで再生して GameEngine を返す"""
+        while self.step(1024):
+            pass
+        return self.engine
+
+    def seek(self, frame):
+        """指定フレームの位置へ移動する（直前のキーフレームから再シミュレーション）"""
+        frame = max(0, min(frame, self.replay.frame_count))
+
+        keyframe = None
+        for index, state in self.replay.keyframes:
+            if index > frame:
+                break
+            keyframe = (index, state)
+
+        # 現在位置から進めた方が近い場合はそのまま進める
+        if keyframe is not None and not (keyframe[0] <= self.frame <= frame):
+            index, state = keyframe
+            self.engine.restore(state)
+            self.engine.frame_count = self.replay.start_frame + index
+            self.frame = index
+            self._inputs = self.replay.iter_inputs(index)
+        elif self.frame > frame:
+            self.restart()
+
+        # 早送り中は音とエフェクトを止める
+        from model.engine import NullAudio, NullEffects
+        audio, effects = self.engine.audio, self.engine.effects
+        self.engine.audio, self.engine.effects = NullAudio(), NullEffects()
+        try:
+            self.step(frame - self.frame)
+        finally:
+            self.engine.audio, self.engine.effects = audio, effects
+
+    def _apply(self, mask):
+        """入力ビットを GameEngine の操作に変換する"""
+        if mask == 0:
+            return
+        engine = self.engine
+        if mask & INPUT_HOLD:
+            engine.hold()
+        if mask & INPUT_LEFT:
+            engine.move_left()
+        if mask & INPUT_RIGHT:
+            engine.move_right()
+        if mask & INPUT_SOFT:
+            engine.move_down()
+        if mask & INPUT_HARD:
+            engine.hard_drop()
+        if mask & INPUT_ROT_CCW:
+            engine.rotate(clockwise=False)
+        if mask & INPUT_ROT_CW:
+            engine.rotate(clockwise=True)
+
@@ -1,7 +1,8 @@
-import copy  # deepcopy を使うため
 #import numpy as np
 
 class Tetromino:
+    __slots__ = ("type", "shape", "rotation", "x", "y")
+
     # テトロミノの形状定義
     # 各テトロミノは4つの回転状態を持つ
     SHAPES = [
@@ -185,18 +186,34 @@ class Tetromino:
     
     def __init__(self, shape, type):
         self.type = type  # テトロミノの種類 (0-6)
-        self.shape = shape
+        self.shape = TetrominoShape.intern(shape)  # 回転データ（共有・不変）
         self.rotation = 0  # 回転状態 (0-3)
         self.x = 0  # X座標
         self.y = 0  # Y座標
     
     @staticmethod
     def create(type):
-        return Tetromino(Tetromino.SHAPES[type], type)
+        return Tetromino(Tetromino.SHAPE_SETS[type], type)
 
     def get_shape(self):
         """現在の回転状態でのテトロミノの形状を取得"""
-        return self.shape[self.rotation]
+        return self.shape.rotations[self.rotation]
+
+    def get_cells(self):
+        """現在の回転状態で埋まっているセルの (dx, dy) 一覧を取得"""
+        return self.shape.cells[self.rotation]
+
+    def get_bounds(self):
+        """現在の回転状態での (左端, 上端, 右端, 下端) を取得"""
+        return self.shape.bounds[self.rotation]
+
+    def get_bottom_profile(self):
+        """現在の回転状態での列ごとの最下段 (dx, dy) 一覧を取得"""
+        return self.shape.bottoms[self.rotation]
+
+    def get_bitmask(self):
+        """現在の回転状態での (行マスク一覧, 左端列, 右端列) を取得"""
+        return self.shape.bitmasks[self.rotation]
     
     # def get_color(self):
     #     """テトロミノの色を取得"""
@@ -219,8 +236,8 @@ class Tetromino:
         return len(self.get_shape())
     
     def copy(self):
-        """このテトロミノのディープコピーを作成して返す"""
-        new_tetromino = Tetromino(copy.deepcopy(self.shape), self.type)
+        """このテトロミノのコピーを作成して返す（回転データは共有する）"""
+        new_tetromino = Tetromino(self.shape, self.type)
         new_tetromino.rotation = self.rotation
         new_tetromino.x = self.x
         new_tetromino.y = self.y
@@ -230,23 +247,118 @@ class Tetromino:
         """他のテトロミノと現在の形状が一致するか判定"""
         #return np.array_equal(np.array(self.get_shape()), np.array(other.get_shape()))
         
-        my_shape = self.get_shape()
-        other_shape = other.get_shape()
-        
-        # まず形状の行数が同じか確認
-        if len(my_shape) != len(other_shape):
-            return False
-        
-        # 各行ごとに比較
-        for i in range(len(my_shape)):
-            # 行の長さが異なる場合
-            if len(my_shape[i]) != len(other_shape[i]):
-                return False
-            
-            # 各要素の比較
-            for j in range(len(my_shape[i])):
-                if my_shape[i][j] != other_shape[i][j]:
-                    return False
-        
-        # すべての要素が一致した場合
-        return True
\ No newline at end of file
+        # 同じ回転データを共有していれば回転状態の比較だけで済む
+        if self.shape is other.shape:
+            return self.rotation == other.rotation
+
+        # 形状はタプルで保持しているので、そのまま比較できる
+        return self.get_shape() == other.get_shape()
+
+
+class TetrominoShape:
+    """テトロミノの回転データ（4回転分の形状と事前計算テーブル）
+
+    不変オブジェクトとしてビットパターンをキーにインターンされ、
+    同じ形状のテトロミノ間で共有される（Flyweight）。
+    """
+    __slots__ = ("key", "rotations", "bitmasks", "cells", "bounds", "bottoms")
+
+    # ビットパターン -> TetrominoShape のキャッシュ
+    _cache = {}
+
+    def __init__(self, key, rotations):
+        self.key = key
+        self.rotations = rotations  # 各回転状態の形状（タプルの行列）
+
+        # 各回転状態のテーブルを事前計算
+        self.bitmasks = tuple(TetrominoShape._build_bitmask(r) for r in rotations)  # ビットボード用の行マスク
+        self.cells = tuple(TetrominoShape._build_cells(r) for r in rotations)  # 埋まっているセルの (dx, dy)
+        self.bounds = tuple(TetrominoShape._build_bounds(c) for c in self.cells)  # バウンディングボックス
+        self.bottoms = tuple(TetrominoShape._build_bottoms(c) for c in self.cells)  # 列ごとの最下段
+
+    @staticmethod
+    def intern(shape):
+        """形状（4回転分の行列）に対応する共有オブジェクトを取得する
+
+        カメラで生成した numpy 配列の形状も、ビットパターンが同じなら同じオブジェクトになる。
+        """
+        if isinstance(shape, TetrominoShape):
+            return shape
+
+        rotations = tuple(tuple(tuple(1 if cell else 0 for cell in row) for row in r)
+                          for r in shape)
+        key = tuple(TetrominoShape._build_key(r) for r in rotations)
+
+        interned = TetrominoShape._cache.get(key)
+        if interned is None:
+            interned = TetrominoShape(key, rotations)
+            TetrominoShape._cache[key] = interned
+        return interned
+
+    @staticmethod
+    def _build_key(shape):
+        """形状を (高さ, 幅, ビットパターン) に変換する"""
+        height = len(shape)
+        width = len(shape[0]) if height > 0 else 0
+        bits = 0
+        for dy, row in enumerate(shape):
+            for dx, cell in enumerate(row):
+                if cell:
+                    bits |= 1 << (dy * width + dx)
+        return height, width, bits
+
+    @staticmethod
+    def _build_bitmask(shape):
+        """形状を (行マスク一覧, 左端列, 右端列) に変換する
+
+        行マスク一覧は (dy, mask) のタプルで、mask のビット dx が形状の列 dx に対応する。
+        """
+        row_masks = []
+        min_x = None
+        max_x = None
+        for dy, row in enumerate(shape):
+            mask = 0
+            for dx, cell in enumerate(row):
+                if cell:
+                    mask |= 1 << dx
+            if mask == 0:
+                continue  # 空の行はスキップ
+
+            row_masks.append((dy, mask))
+            low = (mask & -mask).bit_length() - 1
+            high = mask.bit_length() - 1
+            min_x = low if min_x is None else min(min_x, low)
+            max_x = high if max_x is None else max(max_x, high)
+
+        if min_x is None:
+            return (), 0, -1
+        return tuple(row_masks), min_x, max_x
+
+    @staticmethod
+    def _build_cells(shape):
+        """形状から埋まっているセルの (dx, dy) 一覧を作成する"""
+        return tuple((dx, dy)
+                     for dy, row in enumerate(shape)
+                     for dx, cell in enumerate(row) if cell)
+
+    @staticmethod
+    def _build_bounds(cells):
+        """セル一覧から (左端, 上端, 右端, 下端) を求める"""
+        if not cells:
+            return 0, 0, -1, -1
+        xs = [dx for dx, _ in cells]
+        ys = [dy for _, dy in cells]
+        return min(xs), min(ys), max(xs), max(ys)
+
+    @staticmethod
+    def _build_bottoms(cells):
+        """セル一覧から列ごとの最下段 (dx, 最大dy) の一覧を作成する"""
+        bottoms = {}
+        for dx, dy in cells:
+            if dy > bottoms.get(dx, -1):
+                bottoms[dx] = dy
+        return tuple(sorted(bottoms.items()))
+
+
+# 標準の7種類の回転データ
+Tetromino.SHAPE_SETS = tuple(TetrominoShape.intern(shape) for shape in Tetromino.SHAPES)
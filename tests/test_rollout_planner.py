@@ -0,0 +1,80 @@
+"""RolloutPlanner のテスト
+
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from config import Config
+from controller.auto_player import AutoPlayer, PlanSnapshot
+from controller.rollout_planner import RolloutPlanner
+from model.engine import GameEngine
+from model.tetromino import Tetromino
+
+
+def camera_piece(type):
+    """カメラ（ポーズ推定）で作ったのと同じ、標準にない形のピース"""
+    grid = [
+        [1, 0, 0, 1],
+        [1, 1, 1, 1],
+        [0, 0, 0, 0],
+        [0, 0, 0, 0],
+    ]
+    rotations = [grid]
+    for _ in range(3):
+        rotations.append([list(row) for row in zip(*rotations[-1][::-1])])
+    return Tetromino(rotations, type)
+
+
+class KnownTypesTest(unittest.TestCase):
+    def test_standard_pieces(self):
+        pieces = [Tetromino.create(t) for t in (0, 4, 6)]
+        self.assertEqual(RolloutPlanner.known_types(pieces), [0, 4, 6])
+
+    def test_stops_at_pose_piece(self):
+        # ポーズ推定のピースは種類が7以上
+        pieces = [Tetromino.create(1), camera_piece(9), Tetromino.create(2)]
+        self.assertEqual(RolloutPlanner.known_types(pieces), [1])
+
+    def test_stops_at_object_piece(self):
+        # 物体検出で合体したピースは種類が0-6でも形が違う
+        pieces = [camera_piece(2), Tetromino.create(2)]
+        self.assertEqual(RolloutPlanner.known_types(pieces), [])
+
+
+class RolloutPlanTest(unittest.TestCase):
+    SETTINGS = {
+        "AUTO_STRATEGY": "rollout",
+        "AUTO_ROLLOUT_WORKERS": 0,
+        "AUTO_ROLLOUT_COUNT": 8,
+        "AUTO_ROLLOUT_TIME_MS": 1000,
+        "AUTO_SKYLINE_FILE": "",
+    }
+
+    def setUp(self):
+        self.saved = {key: getattr(Config, key) for key in self.SETTINGS}
+        for key, value in self.SETTINGS.items():
+            setattr(Config, key, value)
+
+    def tearDown(self):
+        for key, value in self.saved.items():
+            setattr(Config, key, value)
+
+    def test_camera_piece_in_queue(self):
+        engine = GameEngine()
+        engine.start(True, 0)
+        engine.spawn_tetromino()
+        engine.next_tetrominos[0] = camera_piece(9)
+        engine.next_tetrominos[1] = camera_piece(3)
+        player = AutoPlayer(engine, background=False)
+
+        plan, placed = player._make_plan(PlanSnapshot.capture(engine))
+        self.assertEqual(plan[-1], "hard")
+        self.assertIsNotNone(placed)
+
+
+if __name__ == "__main__":
+    unittest.main()
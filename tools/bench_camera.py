@@ -0,0 +1,96 @@
+"""カメラ映像の描画のベンチマーク
+
+    python -m tools.bench_camera
+    SDL_VIDEODRIVER=offscreen python -m tools.bench_camera --frames 300   # ウィンドウを出さずに計測（dummy はOpenGLがなく起動できない）
+
+カメラがなくても計測できるよう、ランダムなパレット番号の画像を使う。
+次の方法で CAMERA_VIEW_WIDTH x CAMERA_VIEW_HEIGHT の映像を描画する時間を比べる。
+- pixels:   1画素ずつ pyxel.pset（以前の Renderer.draw_camera）
+- bulk:     毎フレーム、イメージバンクにまとめて書き込み、1回の blt で描画
+- resident: Renderer.draw_camera と同じく、新しい映像が届いた時だけ書き込む（カメラ30fps・描画60fps）
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pyxel
+
+from config import Config
+from tools.benchmark import percentile
+from view.renderer import Renderer
+
+
+def measure(draw, frames):
+    """1フレームずつ描画にかかった時間（ミリ秒）の一覧"""
+    times = []
+    for frame in frames:
+        start = time.perf_counter()
+        draw(frame)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def draw_bulk(indexed):
+    Renderer.upload_camera_image(indexed)
+    Renderer.draw_camera_image(indexed.shape[1], indexed.shape[0])
+
+
+class FrameSource:
+    """AICamera の代わりに映像を渡す（描画 interval フレームごとに新しい映像になる）"""
+    def __init__(self, interval):
+        self.interval = interval
+        self.frame = None
+        self.seq = 0
+        self.count = 0
+
+    def draw(self, frame):
+        if self.count % self.interval == 0:
+            self.frame = frame
+            self.seq += 1
+        self.count += 1
+        Renderer.draw_camera(self)
+
+    def get_frame(self):
+        return self.seq, self.frame
+
+    def get_tetromino(self):
+        return None
+
+    def get_boxes(self):
+        return None
+
+    def get_labels(self):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HITORIS camera view benchmark")
+    parser.add_argument("--frames", type=int, default=120, help="描画するフレーム数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pyxel.init(Config.SCREEN_CAMERA_WIDTH, Config.SCREEN_HEIGHT, title="HITORIS camera benchmark")
+
+    # 実際の映像に近いよう、同じ画像を使い回さずフレームごとに作る
+    rng = np.random.default_rng(args.seed)
+    shape = (Config.CAMERA_VIEW_HEIGHT, Config.CAMERA_VIEW_WIDTH)
+    frames = [rng.integers(0, 16, shape, dtype=np.uint8) for _ in range(args.frames)]
+
+    results = {}
+    methods = (("pixels", Renderer.draw_camera_pixels), ("bulk", draw_bulk),
+               ("resident", FrameSource(2).draw))
+    for name, draw in methods:
+        times = measure(draw, frames)
+        results[name] = percentile(times, 50)
+        print(f"{name:8s} p50 {percentile(times, 50):8.3f} ms  p95 {percentile(times, 95):8.3f} ms  "
+              f"mean {sum(times) / len(times):8.3f} ms")
+
+    for name in ("bulk", "resident"):
+        if results[name] > 0:
+            print(f"speedup {name} (p50) x{results['pixels'] / results[name]:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""AutoPlayer のベンチマーク
+
+    python -m tools.benchmark                          # 計測して結果を表示
+    python -m tools.benchmark --save-baseline bench.json
+    python -m tools.benchmark --baseline bench.json    # 基準と比べて悪化していれば終了コード1
+    python -m tools.benchmark --repeat 1               # 1回だけ計測する（速いが時間の指標がぶれる）
+    python -m tools.benchmark --delay 10               # 操作のディレイを入れる（先読み・時間予算つきの探索を計測する時）
+
+シード固定のゲームをヘッドレスで遊ばせて、次の値を計測する。
+- 計画1回あたりの時間（p50 / p95 / p99、ミリ秒）
+- 1秒あたりに評価した配置の数（計画時間あたり）
+- 1秒あたりに置いたテトロミノの数（ゲーム全体の実時間あたり）
+- 1ゲームあたりのライン数とスコア
+- 次のピースの先読みに使った時間（1フレームあたり）と、先読みが当たった割合
+
+時間予算つきの探索（AUTO_PLAN_BUDGET_US）では、1つのピースに使った探索時間の合計を計画1回の時間とする。
+
+時間の指標は実行ごとにぶれるので、同じ計測を --repeat 回繰り返して中央値を使い、
+基準との比較も --timing-tolerance（既定はライン数などより広い）で判断する。
+p99 のようにサンプルが少ないと最大値と変わらない指標は、サンプル数が足りなければ比較しない。
+"""
+import argparse
+import json
+import sys
+import time
+
+from tools.headless import play_game
+
+# 基準との比較: (指標, 大きい方が良いか, 時間の指標か)
+METRICS = (
+    ("plan_ms_p50", False, True),
+    ("plan_ms_p95", False, True),
+    ("plan_ms_p99", False, True),
+    ("placements_per_sec", True, True),
+    ("pieces_per_sec", True, True),
+    ("lines_per_game", True, False),
+    ("score_per_game", True, False),
+    ("speculate_ms_p99", False, True),
+)
+
+# 比較に必要な最低限のサンプル数: 指標 -> (サンプル数の指標, 最低数)
+MIN_SAMPLES = {
+    "plan_ms_p95": ("plans", 20),
+    "plan_ms_p99": ("plans", 100),
+    "speculate_ms_p99": ("speculate_steps", 100),
+}
+
+
+def percentile(values, p):
+    """p パーセンタイル（線形補間）"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    position = (len(values) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class PlanProbe:
+    """AutoPlayer の計画時間と評価した配置の数を記録する（先読みの分は別に数える）"""
+    def __init__(self, delay=0):
+        self.delay = delay  # 操作のディレイ（0ならヘッドレスの既定どおり待たない）
+        self.plan_times = []
+        self.placements = 0
+        self.speculate_times = []  # 先読みを進めた1フレームごとの時間
+        self.speculate_placements = 0
+        self.speculation_hits = 0
+        self.speculation_misses = 0
+        self._players = []
+
+    def attach(self, player):
+        if self.delay:
+            player.move_delay = player.drop_delay = player.spawn_delay = self.delay
+        make_plan = player._make_plan
+        score_placements = player._score_placements
+
+        def timed_make_plan(snapshot):
+            start = time.perf_counter()
+            result = make_plan(snapshot)
+            self.plan_times.append(time.perf_counter() - start)
+            return result
+
+        def counted_score_placements(board, pieces):
+            self.placements += len(pieces)
+            return score_placements(board, pieces)
+
+        def counted_speculate_placements(board, pieces):
+            self.speculate_placements += len(pieces)
+            return score_placements(board, pieces)
+
+        player._make_plan = timed_make_plan
+        player._score_placements = counted_score_placements
+        if player.beam is not None:
+            player.beam.score_placements = counted_score_placements
+        if player.anytime is not None:
+            player.anytime.beam.score_placements = counted_score_placements
+            self._attach_anytime(player.anytime)
+        if player.speculation is not None:
+            player.speculation.beam.score_placements = counted_speculate_placements
+            self._attach_speculation(player.speculation)
+        self._players.append(player)
+
+    def _attach_anytime(self, planner):
+        """時間予算つきの探索は、start() から次の start() までに step() で使った時間を1回の計画とする"""
+        start_search = planner.start
+        step = planner.step
+
+        def timed_start(snapshot):
+            begin = time.perf_counter()
+            start_search(snapshot)
+            self.plan_times.append(time.perf_counter() - begin)
+
+        def timed_step():
+            begin = time.perf_counter()
+            finished = step()
+            if self.plan_times:
+                self.plan_times[-1] += time.perf_counter() - begin
+            return finished
+
+        planner.start = timed_start
+        planner.step = timed_step
+
+    def _attach_speculation(self, planner):
+        step = planner.step
+
+        def timed_step():
+            begin = time.perf_counter()
+            finished = step()
+            self.speculate_times.append(time.perf_counter() - begin)
+            return finished
+
+        planner.step = timed_step
+
+    def collect(self):
+        """先読みが当たった回数を集計する（ゲームが終わってから呼ぶ）"""
+        for player in self._players:
+            self.speculation_hits += player.speculation_hits
+            self.speculation_misses += player.speculation_misses
+        self._players = []
+
+
+def run(seeds, max_pieces, delay=0):
+    probe = PlanProbe(delay)
+    results = []
+    start = time.perf_counter()
+    for seed in seeds:
+        results.append(play_game(seed, max_pieces=max_pieces, setup_player=probe.attach))
+    elapsed = time.perf_counter() - start
+    probe.collect()
+
+    plan_ms = [t * 1000 for t in probe.plan_times]
+    plan_total = sum(probe.plan_times)
+    speculate_ms = [t * 1000 for t in probe.speculate_times]
+    speculate_total = sum(probe.speculate_times)
+    speculations = probe.speculation_hits + probe.speculation_misses
+    cache_hits = sum(r["plan_cache"]["hits"] for r in results if "plan_cache" in r)
+    cache_lookups = cache_hits + sum(r["plan_cache"]["misses"] for r in results if "plan_cache" in r)
+    games = len(results)
+    return {
+        "games": games,
+        "max_pieces": max_pieces,
+        "delay": delay,
+        "plans": len(plan_ms),
+        "plan_ms_p50": percentile(plan_ms, 50),
+        "plan_ms_p95": percentile(plan_ms, 95),
+        "plan_ms_p99": percentile(plan_ms, 99),
+        "placements_per_sec": probe.placements / plan_total if plan_total else 0.0,
+        "pieces_per_sec": sum(r["pieces"] for r in results) / elapsed,
+        "lines_per_game": sum(r["lines"] for r in results) / games,
+        "score_per_game": sum(r["score"] for r in results) / games,
+        "topped_out": sum(1 for r in results if r["topped_out"]),
+        "speculate_steps": len(speculate_ms),
+        "speculate_ms_p50": percentile(speculate_ms, 50),
+        "speculate_ms_p99": percentile(speculate_ms, 99),
+        "speculate_placements_per_sec": probe.speculate_placements / speculate_total if speculate_total else 0.0,
+        "speculation_hit_rate": probe.speculation_hits / speculations if speculations else 0.0,
+        "plan_cache_lookups": cache_lookups,
+        "plan_cache_hit_rate": cache_hits / cache_lookups if cache_lookups else 0.0,
+    }
+
+
+def run_repeated(seeds, max_pieces, delay=0, repeat=1):
+    """同じ計測を repeat 回繰り返し、時間の指標はそれぞれの中央値を使う（ライン数などはシード固定で毎回同じ）
+
+    最も良い値は偶然速かった1回に引きずられるので、基準にすると次の計測が悪化に見えやすい。
+    """
+    runs = [run(seeds, max_pieces, delay) for _ in range(repeat)]
+    result = dict(runs[0])
+    for key, _, timing in METRICS:
+        if timing:
+            result[key] = percentile([r[key] for r in runs], 50)
+    result["repeat"] = repeat
+    return result
+
+
+def compare(result, baseline, tolerance, timing_tolerance):
+    """基準より tolerance（時間の指標は timing_tolerance）の割合を超えて悪化した指標の一覧を返す"""
+    regressions = []
+    for key, higher_is_better, timing in METRICS:
+        if key not in baseline:
+            continue
+        if key in MIN_SAMPLES:
+            count_key, minimum = MIN_SAMPLES[key]
+            if min(result[count_key], baseline.get(count_key, 0)) < minimum:
+                continue  # サンプルが少なすぎて比べられない
+        if timing:
+            tolerance = timing_tolerance
+        base = baseline[key]
+        value = result[key]
+        if higher_is_better:
+            worse = value < base * (1 - tolerance)
+        else:
+            worse = value > base * (1 + tolerance)
+        if worse:
+            regressions.append((key, base, value))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HITORIS AutoPlayer benchmark")
+    parser.add_argument("--games", type=int, default=8, help="遊ばせるゲーム数（シード0から順に）")
+    parser.add_argument("--pieces", type=int, default=300, help="1ゲームで出すテトロミノの最大数")
+    parser.add_argument("--delay", type=int, default=0, help="操作ごとのディレイ（フレーム数）")
+    parser.add_argument("--baseline", help="比較する基準の結果ファイル")
+    parser.add_argument("--save-baseline", help="結果を基準として保存するファイル")
+    parser.add_argument("--repeat", type=int, default=5, help="計測を繰り返す回数（時間の指標は中央値を使う）")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="悪化とみなす変化の割合")
+    parser.add_argument("--timing-tolerance", type=float, default=0.25, help="時間の指標で悪化とみなす変化の割合")
+    args = parser.parse_args()
+
+    result = run_repeated(range(args.games), args.pieces, args.delay, args.repeat)
+
+    for key, _, _ in METRICS:
+        print(f"{key:28s} {result[key]:12.2f}")
+    print(f"{'plans':28s} {result['plans']:12d}")
+    print(f"{'topped_out':28s} {result['topped_out']:12d} / {result['games']}")
+    if result["speculate_steps"]:
+        print(f"{'speculate_steps':28s} {result['speculate_steps']:12d}")
+        print(f"{'speculate_placements_per_sec':28s} {result['speculate_placements_per_sec']:12.2f}")
+        print(f"{'speculation_hit_rate':28s} {result['speculation_hit_rate']:12.2f}")
+    if result["plan_cache_lookups"]:
+        print(f"{'plan_cache_lookups':28s} {result['plan_cache_lookups']:12d}")
+        print(f"{'plan_cache_hit_rate':28s} {result['plan_cache_hit_rate']:12.2f}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"baseline saved -> {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        measured = (baseline.get("games"), baseline.get("max_pieces"), baseline.get("delay", 0),
+                    baseline.get("repeat", 1))
+        if measured != (result["games"], result["max_pieces"], result["delay"], result["repeat"]):
+            print("WARNING: baseline was measured with different --games/--pieces/--delay/--repeat")
+
+        regressions = compare(result, baseline, args.tolerance, args.timing_tolerance)
+        for key, base, value in regressions:
+            print(f"REGRESSION {key}: {base:.2f} -> {value:.2f}")
+        if regressions:
+            return 1
+        print("no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
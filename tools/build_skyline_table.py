@@ -0,0 +1,135 @@
+"""スカイライン表（表面の形 -> 配置の候補）を作るツール
+
+    python -m tools.build_skyline_table
+    python -m tools.build_skyline_table --clip 1 --top-k 8 --output assets/skyline_table.bin
+
+隣り合う列の高さの差を ±clip に切り詰めた輪郭ごとに、その輪郭を持つ穴のない盤面を作り、
+テトロミノの種類ごとにすべての (x, 回転) を落とした結果を表面だけで評価して、良い順に top_k 個を記録する。
+ライン消去は表面だけでは分からないので評価に含めない（実行時に候補を実際の盤面で評価し直す）。
+
+評価関数の重みは AutoPlayer と同じもの（Config.AUTO_WEIGHTS_FILE があればそれ）を使う。
+重みを調整し直したら表も作り直すこと（重みが違う表は AutoPlayer が使わない）。
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+from config import Config
+from controller.auto_player import AutoPlayer
+from controller.skyline_table import SkylineTable
+from model.engine import GameEngine
+from model.tetromino import Tetromino
+
+
+def piece_drops(piece_type, width):
+    """種類ごとの落とし方 [(x, 回転, セル, 最下段), ...]（着地後に同じ形になるものは最初の1つだけ）"""
+    shape = Tetromino.SHAPE_SETS[piece_type]
+    rotations = (0,) if piece_type == 3 else range(4)  # Oテトロミノは回転しない
+    drops = []
+    seen = set()
+    for rotation in rotations:
+        left, top, right, bottom = shape.bounds[rotation]
+        for x in range(-left, width - right):
+            cells = tuple((x + dx, dy - top) for dx, dy in shape.cells[rotation])
+            key = frozenset(cells)
+            if key in seen:
+                continue
+            seen.add(key)
+            bottoms = tuple((x + dx, dy - top) for dx, dy in shape.bottoms[rotation])
+            drops.append((x, rotation, cells, bottoms))
+    return drops
+
+
+def contour_heights(index, width, clip):
+    """輪郭の番号から、最も低い列を0とした列の高さを作る"""
+    base = 2 * clip + 1
+    diffs = []
+    for _ in range(width - 1):
+        diffs.append(index % base - clip)
+        index //= base
+    diffs.reverse()
+    heights = [0]
+    for diff in diffs:
+        heights.append(heights[-1] + diff)
+    low = min(heights)
+    return [h - low for h in heights]
+
+
+def score_drop(heights, cells, bottoms, weights):
+    """穴のない盤面にピースを落とした時の、ライン消去を除いたスコア"""
+    # ピースの最上段（dy=0）の高さ: 最下段のセルがすべて列の上に乗る最小の高さ
+    level = max(heights[c] + dy for c, dy in bottoms)
+    new_heights = heights[:]
+    for c, dy in cells:
+        if level - dy + 1 > new_heights[c]:
+            new_heights[c] = level - dy + 1
+    holes = sum(level - dy - heights[c] for c, dy in bottoms)
+    bumpiness = sum(abs(a - b) for a, b in zip(new_heights, new_heights[1:]))
+    return (weights["holes"] * holes
+            + weights["agg_height"] * sum(new_heights)
+            + weights["bumpiness"] * bumpiness
+            + weights["max_height"] * max(new_heights))
+
+
+def _build_piece(task):
+    """プロセスプールで実行する1種類分の表"""
+    piece_type, width, clip, top_k, weights = task
+    drops = piece_drops(piece_type, width)
+    body = bytearray()
+    for index in range(SkylineTable.contour_count(width, clip)):
+        heights = contour_heights(index, width, clip)
+        scored = sorted(((score_drop(heights, cells, bottoms, weights), order)
+                         for order, (_, _, cells, bottoms) in enumerate(drops)),
+                        key=lambda item: (-item[0], item[1]))
+        codes = [SkylineTable.encode(drops[order][0], drops[order][1]) for _, order in scored[:top_k]]
+        codes += [SkylineTable.EMPTY] * (top_k - len(codes))
+        body.extend(codes)
+    return piece_type, bytes(body)
+
+
+def load_weights(path):
+    """AutoPlayer と同じ重み（重みファイルがあればそれ）"""
+    weights = dict(AutoPlayer.WEIGHTS)
+    if path and os.path.exists(path):
+        weights.update(AutoPlayer.load_weights(path))
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HITORIS skyline table builder")
+    parser.add_argument("--clip", type=int, default=1, help="隣の列との高さの差をこの値で切り詰める")
+    parser.add_argument("--top-k", type=int, default=8, help="輪郭ごとに記録する候補の数")
+    parser.add_argument("--weights", default=Config.AUTO_WEIGHTS_FILE, help="評価関数の重みファイル")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default=Config.AUTO_SKYLINE_FILE)
+    args = parser.parse_args()
+
+    width = GameEngine().board.width
+    weights = load_weights(args.weights)
+    start = time.perf_counter()
+
+    tasks = [(piece_type, width, args.clip, args.top_k, weights)
+             for piece_type in range(len(Tetromino.SHAPE_SETS))]
+    bodies = [None] * len(tasks)
+    with multiprocessing.Pool(min(args.workers, len(tasks))) as pool:
+        for piece_type, body in pool.imap_unordered(_build_piece, tasks):
+            bodies[piece_type] = body
+
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    meta = {"weights": weights}
+    tmp_path = args.output + ".tmp"
+    SkylineTable.write(tmp_path, width, args.clip, args.top_k, meta, b"".join(bodies))
+    os.replace(tmp_path, args.output)
+
+    contours = SkylineTable.contour_count(width, args.clip)
+    print(f"{contours} contours x {len(tasks)} pieces x {args.top_k} -> {args.output} "
+          f"({os.path.getsize(args.output)} bytes, {time.perf_counter() - start:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""ヘッドレスでAIに1ゲームを遊ばせる（チューニングやベンチマーク用）
+
+pyxelを使わず GameEngine と AutoPlayer だけで、操作のディレイなしに最高速で進める。
+"""
+from model.engine import GameEngine
+from controller.auto_player import AutoPlayer
+
+
+def play_game(seed, weights=None, max_pieces=500, max_frames=None, setup_player=None):
+    """シードを指定してAIに1ゲーム遊ばせ、結果を辞書で返す
+
+    max_pieces 個のテトロミノを出したか、ゲームオーバーになったら終了する。
+    計画のキャッシュを使っている時は、その命中数も plan_cache に入れて返す。
+    setup_player を指定すると、作った AutoPlayer を渡して呼ぶ（計測用のフックを仕込むため）。
+    """
+    engine = GameEngine()
+    player = AutoPlayer(engine, background=False, weights=weights)
+    player.move_delay = player.drop_delay = player.spawn_delay = 0
+    if setup_player is not None:
+        setup_player(player)
+
+    engine.start(True, seed)
+    pieces = 0
+    frames = 0
+    last_piece = None
+    while not engine.is_game_over and not engine.game_over_triggered:
+        if max_frames is not None and frames >= max_frames:
+            break
+        if engine.current_tetromino is not last_piece and engine.current_tetromino is not None:
+            last_piece = engine.current_tetromino
+            pieces += 1
+            if pieces > max_pieces:
+                break
+
+        player.update()
+        engine.update()
+        frames += 1
+
+    result = {
+        "seed": seed,
+        "score": engine.score,
+        "lines": engine.lines_cleared,
+        "pieces": min(pieces, max_pieces),
+        "frames": frames,
+        "topped_out": engine.game_over_triggered,
+    }
+    if player.plan_cache is not None:
+        result["plan_cache"] = player.plan_cache.stats()
+    return result
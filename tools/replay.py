@@ -0,0 +1,59 @@
+"""リプレイファイルの確認・検証ツール
+
+    python -m tools.replay info FILE...
+    python -m tools.replay verify FILE...
+
+verify はヘッドレスで最高速に再シミュレーションし、記録されたスコアとライン数が
+一致するかを確認する（不一致があれば終了コード1）。
+描画しながら再生する場合は python main.py --replay FILE --speed N を使う。
+"""
+import argparse
+import sys
+import time
+
+from model.replay import Replay, ReplayPlayer
+
+
+def info(paths):
+    for path in paths:
+        replay = Replay.load(path)
+        print(f"{path}: seed={replay.seed} mode={replay.mode} frames={replay.frame_count} "
+              f"runs={len(replay.runs)} keyframes={len(replay.keyframes)} "
+              f"score={replay.score} lines={replay.lines}"
+              f"{' auto' if replay.is_auto_play else ''}{' camera' if replay.camera_used else ''}")
+    return 0
+
+
+def verify(paths):
+    failed = 0
+    for path in paths:
+        replay = Replay.load(path)
+        if replay.camera_used:
+            print(f"{path}: SKIP (camera tetrominos cannot be replayed)")
+            continue
+
+        start = time.perf_counter()
+        engine = ReplayPlayer(replay).run()
+        elapsed = time.perf_counter() - start
+
+        ok = engine.score == replay.score and engine.lines_cleared == replay.lines
+        failed += 0 if ok else 1
+        print(f"{path}: {'OK' if ok else 'MISMATCH'} "
+              f"score={engine.score}/{replay.score} lines={engine.lines_cleared}/{replay.lines} "
+              f"({replay.frame_count / max(elapsed, 1e-9):.0f} frames/s)")
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HITORIS replay tool")
+    parser.add_argument("command", choices=("info", "verify"))
+    parser.add_argument("files", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        return info(args.files)
+    return verify(args.files)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""AutoPlayer の評価関数の重みを調整するツール（クロスエントロピー法）
+
+    python -m tools.tune_weights --generations 30 --population 64 --games 8
+    python -m tools.tune_weights --workers 32 --output assets/ai_weights.json
+
+世代ごとに重みの候補を正規分布からサンプリングし、シード固定のヘッドレスゲームで評価する。
+上位（エリート）の平均と標準偏差で分布を更新する。
+世代ごとのシードは毎回変わるので、その世代の成績は運に左右される。
+保存する重みは、エリートと更新後の平均を固定の検証用シードで評価し直し、その成績で選ぶ。
+評価は (候補, シード) ごとの独立したタスクとして multiprocessing のプールに分配するので、
+コア数に比例して速くなる（タスク数 = population × games がコア数より十分多い場合）。
+
+検証の成績が更新されるたびに JSON に書き出す（途中で止めても結果が残る）。
+AutoPlayer は起動時に Config.AUTO_WEIGHTS_FILE があれば読み込む。
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from config import Config
+from controller.auto_player import AutoPlayer
+from tools.headless import play_game
+
+KEYS = tuple(AutoPlayer.WEIGHTS)
+
+
+def _evaluate(task):
+    """プロセスプールで実行する1ゲーム分の評価"""
+    index, weights, seed, max_pieces = task
+    result = play_game(seed, weights, max_pieces)
+    return index, result["lines"]
+
+
+class CrossEntropyTuner:
+    """クロスエントロピー法による重みの探索"""
+    MIN_STD = 0.05  # 標準偏差の下限（平均に対する比率。早すぎる収束を防ぐ）
+
+    def __init__(self, initial, population, elite_ratio, rng):
+        self.mean = [float(initial[k]) for k in KEYS]
+        self.std = [max(abs(v) * 0.5, 1.0) for v in self.mean]
+        # 重みは定数倍しても選ぶ手が変わらないので、大きさは初期値に揃える（Holdのコストと釣り合わせるため）
+        self.norm = math.sqrt(sum(v * v for v in self.mean))
+        self.population = population
+        self.elite_count = max(2, int(population * elite_ratio))
+        self.rng = rng
+
+    def sample(self):
+        """現在の分布から候補を population 個サンプリング"""
+        candidates = []
+        for _ in range(self.population):
+            vector = [self.rng.gauss(m, s) for m, s in zip(self.mean, self.std)]
+            candidates.append(self._normalize(vector))
+        return candidates
+
+    def update(self, candidates, fitness):
+        """上位の候補で分布を更新し、その候補（エリート）を返す"""
+        order = sorted(range(len(candidates)), key=lambda i: fitness[i], reverse=True)
+        elite = [candidates[i] for i in order[:self.elite_count]]
+        for k in range(len(KEYS)):
+            values = [e[k] for e in elite]
+            mean = sum(values) / len(values)
+            variance = sum((v - mean) ** 2 for v in values) / len(values)
+            self.mean[k] = mean
+            self.std[k] = max(math.sqrt(variance), abs(mean) * self.MIN_STD, 1e-3)
+        return elite
+
+    def _normalize(self, vector):
+        length = math.sqrt(sum(v * v for v in vector))
+        if length == 0:
+            return list(self.mean)
+        return [v * self.norm / length for v in vector]
+
+
+def evaluate_all(pool, candidates, seeds, max_pieces):
+    """全候補をすべてのシードで遊ばせ、候補ごとの1ゲームあたりの平均ライン数を返す"""
+    tasks = [(index, dict(zip(KEYS, candidate)), seed, max_pieces)
+             for index, candidate in enumerate(candidates) for seed in seeds]
+    totals = [0] * len(candidates)
+    for index, lines in pool.imap_unordered(_evaluate, tasks, chunksize=1):
+        totals[index] += lines
+    return [total / len(seeds) for total in totals]
+
+
+def load_initial(path):
+    """既存の重みファイルがあればそこから始める"""
+    weights = dict(AutoPlayer.WEIGHTS)
+    if path and os.path.exists(path):
+        weights.update(AutoPlayer.load_weights(path))
+    return weights
+
+
+def save(path, weights, fitness, generation, args):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    data = {
+        "weights": weights,
+        "fitness": fitness,  # 1ゲームあたりの平均ライン数
+        "generation": generation,
+        "games": args.validation,  # 検証に使ったゲーム数
+        "max_pieces": args.pieces,
+        "seed": args.seed,
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HITORIS AutoPlayer weight tuner")
+    parser.add_argument("--generations", type=int, default=30)
+    parser.add_argument("--population", type=int, default=64)
+    parser.add_argument("--elite", type=float, default=0.2, help="分布の更新に使う上位の割合")
+    parser.add_argument("--games", type=int, default=8, help="候補ごとのゲーム数")
+    parser.add_argument("--validation", type=int, default=16, help="保存する重みを選ぶ検証用のゲーム数")
+    parser.add_argument("--pieces", type=int, default=500, help="1ゲームで出すテトロミノの最大数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=Config.AUTO_WEIGHTS_FILE)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    tuner = CrossEntropyTuner(load_initial(args.output), args.population, args.elite, rng)
+    # 検証用のシードは全世代で共通（学習用のシードとは重ならない範囲から取る）
+    validation_seeds = [args.seed * 1000003 + 500000 + i for i in range(args.validation)]
+
+    with multiprocessing.Pool(args.workers) as pool:
+        # 初期値の検証成績を基準にする（以降はこれを超えた時だけ書き出す）
+        best_fitness = evaluate_all(pool, [tuner.mean], validation_seeds, args.pieces)[0]
+        best_weights = {k: round(v, 4) for k, v in zip(KEYS, tuner.mean)}
+        save(args.output, best_weights, best_fitness, -1, args)
+        print(f"initial: validation={best_fitness:.1f}", flush=True)
+
+        for generation in range(args.generations):
+            start = time.perf_counter()
+            candidates = tuner.sample()
+
+            # 世代内では全候補に同じシードを使う（運の差で比べないように）
+            seeds = [args.seed * 1000003 + generation * args.games + i for i in range(args.games)]
+            fitness = evaluate_all(pool, candidates, seeds, args.pieces)
+            elite = tuner.update(candidates, fitness)
+
+            # エリートと更新後の平均を検証用のシードで評価し直して比べる
+            finalists = elite + [list(tuner.mean)]
+            validation = evaluate_all(pool, finalists, validation_seeds, args.pieces)
+            best_index = max(range(len(finalists)), key=validation.__getitem__)
+            if validation[best_index] > best_fitness:
+                best_fitness = validation[best_index]
+                best_weights = {k: round(v, 4) for k, v in zip(KEYS, finalists[best_index])}
+                save(args.output, best_weights, best_fitness, generation, args)
+
+            elapsed = time.perf_counter() - start
+            games = len(candidates) * len(seeds) + len(finalists) * len(validation_seeds)
+            print(f"gen {generation:3d}: best={max(fitness):.1f} "
+                  f"mean={sum(fitness) / len(fitness):.1f} validation={validation[best_index]:.1f} "
+                  f"all-time={best_fitness:.1f} ({games / elapsed:.1f} games/s)", flush=True)
+
+    print(f"best weights ({best_fitness:.1f} lines/game on {args.validation} validation games) -> {args.output}")
+    print(json.dumps(best_weights, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 import pyxel
 import math
+from itertools import islice
 from config import Config
 
 class Renderer:
@@ -33,6 +34,15 @@ class Renderer:
 
     CAMERA_TETROMINO_X = 405
     CAMERA_TETROMINO_Y = 25
+
+    # カメラ映像の描画位置
+    CAMERA_X = 260
+    CAMERA_Y = 20
+
+    # カメラ映像を書き込むイメージバンクのバッファ（NumPyの配列として直接書き込む）
+    _camera_buffer = None
+    _hex_table = None  # パレット番号 -> 16進数の文字コード（古いPyxel用）
+    _camera_uploaded = None  # イメージバンクにある映像の (カメラ, 通し番号)
     
     @staticmethod
     def initialize():
@@ -76,21 +86,18 @@ class Renderer:
         if tetromino is None:
             return
 
-        shape = tetromino.get_shape()
         size = Renderer.BLOCK_SIZE * scale
 
-        for y in range(len(shape)):
-            for x in range(len(shape[y])):
-                if shape[y][x] != 0:
-                    block_x = offset_x + x * size
-                    block_y = offset_y + y * size
-                    
-                    # 画像からブロックを描画
-                    Renderer.draw_block_from_image(
-                        block_x, block_y, 
-                        tetromino.type, 
-                        is_ghost
-                    )
+        for x, y in tetromino.get_cells():
+            block_x = offset_x + x * size
+            block_y = offset_y + y * size
+            
+            # 画像からブロックを描画
+            Renderer.draw_block_from_image(
+                block_x, block_y, 
+                tetromino.type, 
+                is_ghost
+            )
 
     @staticmethod
     def draw_board(board):
@@ -123,14 +130,10 @@ class Renderer:
         if tetromino is None:
             return
             
-        shape = tetromino.get_shape()
-        
-        for y in range(len(shape)):
-            for x in range(len(shape[y])):
-                if shape[y][x] != 0:
-                    block_x = Renderer.BOARD_X + (tetromino.x + x) * Renderer.BLOCK_SIZE
-                    block_y = Renderer.BOARD_Y + (tetromino.y + y) * Renderer.BLOCK_SIZE
-                    Renderer.draw_block_from_image(block_x, block_y, tetromino.type)
+        for x, y in tetromino.get_cells():
+            block_x = Renderer.BOARD_X + (tetromino.x + x) * Renderer.BLOCK_SIZE
+            block_y = Renderer.BOARD_Y + (tetromino.y + y) * Renderer.BLOCK_SIZE
+            Renderer.draw_block_from_image(block_x, block_y, tetromino.type)
                     
     @staticmethod
     def draw_ghost_tetromino(tetromino, board):
@@ -138,36 +141,16 @@ class Renderer:
         if tetromino is None:
             return
             
-        # 現在のテトロミノの位置を保存
-        original_y = tetromino.y
-        ghost_y = original_y
-        
-        # ゴーストテトロミノを一番下まで落とす
-        while True:
-            ghost_y += 1
-            
-            # テトロミノの仮の位置を設定
-            tetromino.y = ghost_y
-            
-            # 位置が無効なら一つ上に戻す
-            if not board.is_valid_position(tetromino):
-                ghost_y -= 1
-                break
-                
-        # 元の位置に戻す
-        tetromino.y = original_y
+        # 着地位置（盤面かテトロミノが動くまでキャッシュされる）
+        ghost_y = board.get_landing_y(tetromino)
         
         # ゴーストテトロミノを描画
-        shape = tetromino.get_shape()
-        
-        for y in range(len(shape)):
-            for x in range(len(shape[y])):
-                if shape[y][x] != 0:
-                    block_x = Renderer.BOARD_X + (tetromino.x + x) * Renderer.BLOCK_SIZE
-                    block_y = Renderer.BOARD_Y + (ghost_y + y) * Renderer.BLOCK_SIZE
-                    
-                    # ゴーストテトロミノを画像から描画
-                    Renderer.draw_block_from_image(block_x, block_y, tetromino.type, is_ghost=True)
+        for x, y in tetromino.get_cells():
+            block_x = Renderer.BOARD_X + (tetromino.x + x) * Renderer.BLOCK_SIZE
+            block_y = Renderer.BOARD_Y + (ghost_y + y) * Renderer.BLOCK_SIZE
+            
+            # ゴーストテトロミノを画像から描画
+            Renderer.draw_block_from_image(block_x, block_y, tetromino.type, is_ghost=True)
                     
     @staticmethod
     def draw_hold(hold_tetromino):
@@ -209,7 +192,7 @@ class Renderer:
         pyxel.text(Renderer.NEXT_X +  (Renderer.NEXT_WIDTH + 2 - len(text) * 4) /2, Renderer.NEXT_Y - 10, text, 7)
         
         # 次の2つのテトロミノを描画
-        for i, tetromino in enumerate(next_tetrominos[:2]):
+        for i, tetromino in enumerate(islice(next_tetrominos, 2)):
             if tetromino is None:
                 continue
                 
@@ -270,20 +253,16 @@ class Renderer:
         if camera == None:
             return
         
-        offset_x = 260
-        offset_y = 20
-        frame = camera.get_frame()
+        offset_x = Renderer.CAMERA_X
+        offset_y = Renderer.CAMERA_Y
+        seq, indexed = camera.get_frame()
 
-        if frame is not None:
-            reduced = frame >> 2
-            r = reduced[:, :, 0]
-            g = reduced[:, :, 1]
-            b = reduced[:, :, 2]
-            indexed = camera.color_lut[r, g, b]
-
-            for y in range(200):
-                for x in range(200):
-                    pyxel.pset(offset_x + x, offset_y + y, int(indexed[y, x]))
+        if indexed is not None:
+            # 新しい映像が届いた時だけ書き込み、それ以外はイメージバンクに残っている映像を使う
+            if Renderer._camera_uploaded != (camera, seq):
+                Renderer.upload_camera_image(indexed)
+                Renderer._camera_uploaded = (camera, seq)
+            Renderer.draw_camera_image(indexed.shape[1], indexed.shape[0])
 
         pyxel.rectb(offset_x - 2, offset_y - 2, 202, 202, 7)
 
@@ -351,3 +330,49 @@ class Renderer:
             pyxel.dither(1.0)
 
             pyxel.text(259 + (Config.CAMERA_VIEW_WIDTH -len(label) * 4) / 2 , Config.CAMERA_VIEW_HEIGHT , label, 7)
+
+    @staticmethod
+    def upload_camera_image(indexed):
+        """パレット番号の画像（uint8 の2次元配列）をイメージバンクにまとめて書き込む"""
+        height, width = indexed.shape
+        image = Renderer._image_bank(Config.CAMERA_IMAGE_BANK)
+
+        if hasattr(image, "data_ptr"):
+            # イメージバンクのメモリに直接コピーする
+            if Renderer._camera_buffer is None:
+                import numpy as np
+                shape = (image.height, image.width)
+                Renderer._camera_buffer = np.ctypeslib.as_array(image.data_ptr(), shape).reshape(shape)
+            Renderer._camera_buffer[:height, :width] = indexed
+        else:
+            # data_ptr() のない古いPyxelでは、行ごとの16進数文字列で書き込む
+            hex_digits = Renderer._hex_digits()
+            image.set(0, 0, [row.tobytes().decode("ascii") for row in hex_digits[indexed]])
+
+    @staticmethod
+    def draw_camera_image(width, height):
+        """イメージバンクに書き込んだカメラ映像を1回の blt で描画する"""
+        pyxel.blt(Renderer.CAMERA_X, Renderer.CAMERA_Y, Config.CAMERA_IMAGE_BANK, 0, 0, width, height)
+
+    @staticmethod
+    def draw_camera_pixels(indexed):
+        """カメラ映像を1画素ずつ描画する（遅い。tools/bench_camera.py での比較用）"""
+        height, width = indexed.shape
+        for y in range(height):
+            for x in range(width):
+                pyxel.pset(Renderer.CAMERA_X + x, Renderer.CAMERA_Y + y, int(indexed[y, x]))
+
+    @staticmethod
+    def _image_bank(index):
+        """イメージバンクを取得する（pyxel.images のない古いPyxelでは pyxel.image() を使う）"""
+        if hasattr(pyxel, "images"):
+            return pyxel.images[index]
+        return pyxel.image(index)
+
+    @staticmethod
+    def _hex_digits():
+        """パレット番号 -> 16進数の文字コードの表"""
+        if Renderer._hex_table is None:
+            import numpy as np
+            Renderer._hex_table = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+        return Renderer._hex_table